@@ -1,16 +1,44 @@
-from fastapi import APIRouter, UploadFile, File, BackgroundTasks, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from datetime import datetime
+import hashlib
+import os
+import tempfile
 import uuid
-from typing import List
-from app.models.profile import UploadCSVResponse, FlaggedProfile, EditFlaggedProfileRequest, EditFlaggedProfileResponse
-from app.services.profile_service import process_profiles_file
-from app.database.supabase_client import supabase
+from typing import List, Literal, Optional
+from app.database.bulk import BulkWriteAborted
+from app.models.profile import (
+    UploadCSVResponse, UploadStatusResponse, FlaggedProfilePage, EditFlaggedProfileRequest, EditFlaggedProfileResponse,
+    PromotionStatusResponse,
+)
+from app.services import exports, flagged_profiles, promotion, upload_jobs
+from app.services.flagged_profiles import DEFAULT_FLAGGED_PAGE_SIZE, MAX_FLAGGED_PAGE_SIZE
+from app.services.name_index import invalidate_name_index
+from app.services.public_profiles import InvalidCursor, invalidate_public_cache
+from app.services.telemetry import log_event
 
 router = APIRouter(prefix="/admin/profiles", tags=["admin profiles"])
 
+# Bytes copied per read when spooling an upload to disk
+UPLOAD_SPOOL_CHUNK_BYTES = 1024 * 1024
+
+async def spool_upload(file: UploadFile) -> tuple[str, str]:
+    """
+    Copies an upload to a temporary file in fixed-size chunks and returns its path and
+    the SHA-256 of its content. The background task owns the file and removes it when done.
+    """
+    suffix = os.path.splitext(file.filename or "")[1]
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(prefix="upload-", suffix=suffix, delete=False) as tmp:
+        while chunk := await file.read(UPLOAD_SPOOL_CHUNK_BYTES):
+            tmp.write(chunk)
+            digest.update(chunk)
+    return tmp.name, digest.hexdigest()
+
 @router.post("/upload-file", response_model=UploadCSVResponse)
-async def upload_file(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
-    print("File Content-Type:", file.content_type)
+async def upload_file(file: UploadFile = File(...)):
+    log_event("upload_received", filename=file.filename, contentType=file.content_type)
     allowed_types = [
         "text/csv",
         "application/vnd.ms-excel",
@@ -20,11 +48,109 @@ async def upload_file(background_tasks: BackgroundTasks, file: UploadFile = File
     if file.content_type not in allowed_types:
         raise HTTPException(status_code=400, detail="Only CSV or XLSX files allowed")
 
-    file_bytes = await file.read()
+    file_path, content_hash = await spool_upload(file)
     upload_id = str(uuid.uuid4())
     submitted_at = datetime.utcnow()
 
-    background_tasks.add_task(process_profiles_file, file_bytes, file.filename, upload_id)
+    try:
+        job = upload_jobs.submit_upload(upload_id, file_path, file.filename, submitted_at, content_hash)
+    except upload_jobs.UploadQueueFull as e:
+        os.remove(file_path)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+    except upload_jobs.UploadQueueUnavailable as e:
+        os.remove(file_path)
+        raise HTTPException(status_code=503, detail=str(e))
+
+    # An identical earlier upload comes back with its own id and result
+    return UploadCSVResponse(
+        uploadId=job["uploadId"], status=job["status"], submittedAt=job["submittedAt"], reused=job["uploadId"] != upload_id
+    )
+
+@router.get("/uploads/{upload_id}", response_model=UploadStatusResponse)
+async def get_upload_status(upload_id: str):
+    job = upload_jobs.get_job(upload_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+    rows_per_second = None
+    if job["startedAt"]:
+        elapsed = ((job["finishedAt"] or datetime.utcnow()) - job["startedAt"]).total_seconds()
+        if elapsed > 0:
+            rows_per_second = round(job["progress"]["rowsRead"] / elapsed, 1)
+
+    return UploadStatusResponse(**job, rowsPerSecond=rows_per_second)
+
+
+@router.post("/cache/invalidate")
+async def invalidate_profile_caches():
+    """Drops the cached public responses and name index, e.g. after profiles were repopulated out of process."""
+    invalidate_public_cache()
+    invalidate_name_index("profiles")
+    return {"status": "invalidated"}
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+@router.get("/export")
+async def export_table(
+    table: Literal["profiles", "staging"] = "profiles",
+    file_format: Literal["csv", "xlsx"] = Query("csv", alias="format"),
+):
+    """
+    Downloads a table in PROFILE_COLUMNS order. CSV is streamed page by page as it is read;
+    XLSX is built in a temporary file first (a workbook can't be sent before it is complete).
+    """
+    filename = f"{table}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{file_format}"
+    if file_format == "csv":
+        return StreamingResponse(
+            exports.iter_csv(table), media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    fd, path = tempfile.mkstemp(prefix="export-", suffix=".xlsx")
+    os.close(fd)
+    try:
+        await exports.write_xlsx(table, path)
+    except BaseException:
+        os.remove(path)
+        raise
+    return FileResponse(path, media_type=XLSX_MEDIA_TYPE, filename=filename, background=BackgroundTask(os.remove, path))
+
+@router.get("/flagged", response_model=FlaggedProfilePage)
+async def list_flagged_profiles(
+    issue: Optional[str] = Query(
+        None, description='Only profiles flagged with this issue message ("Possible duplicate of" matches every near-duplicate issue)'
+    ),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_FLAGGED_PAGE_SIZE, ge=1, le=MAX_FLAGGED_PAGE_SIZE),
+):
+    try:
+        return await flagged_profiles.list_flagged_profiles(issue, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/flagged/edit", response_model=List[EditFlaggedProfileResponse])
+async def edit_flagged_profiles(edits: List[EditFlaggedProfileRequest]):
+    """Applies many reviewer edits at once; each profile gets its own result."""
+    try:
+        return await flagged_profiles.apply_profile_edits([edit.model_dump() for edit in edits])
+    except BulkWriteAborted as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
-    return UploadCSVResponse(uploadId=upload_id, status="processing", submittedAt=submitted_at)
+@router.post("/promote", response_model=PromotionStatusResponse, status_code=202)
+async def promote_staging(dry_run: bool = True, include_flagged: bool = False):
+    """
+    Starts a staging -> profiles promotion in the background. dry_run (the default) only
+    computes the field-level diff; poll GET /promotions/{promotion_id} for the result.
+    """
+    try:
+        job = promotion.submit_promotion(dry_run=dry_run, include_flagged=include_flagged)
+    except promotion.PromotionInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PromotionStatusResponse(**job)
 
+@router.get("/promotions/{promotion_id}", response_model=PromotionStatusResponse)
+async def get_promotion_status(promotion_id: str):
+    job = promotion.get_promotion(promotion_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Promotion not found")
+    return PromotionStatusResponse(**job)
@@ -0,0 +1,42 @@
+import time
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.services import telemetry
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Request, upload and Supabase metrics in the Prometheus text format."""
+    return PlainTextResponse(telemetry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+class RequestTimingMiddleware:
+    """
+    Records every HTTP request in http_request_duration_seconds, labelled by its route template
+    (/profiles/{full_name}, not the actual path) so the number of series stays bounded.
+    Plain ASGI rather than BaseHTTPMiddleware, so streamed responses are timed until their last chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            telemetry.HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start, method=scope["method"], route=route, status=str(status)
+            )
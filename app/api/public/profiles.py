@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from typing import Optional
+from app.models.profile import ProfileListResponse
+from app.services import public_profiles
+from app.services.public_profiles import CachedResponse, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, PUBLIC_CACHE_MAX_AGE
+
+router = APIRouter(prefix="/profiles", tags=["profiles"])
+
+def cached_json(entry: CachedResponse, if_none_match: Optional[str]) -> Response:
+    """The cached body, or 304 Not Modified if the client already has this version."""
+    headers = {"ETag": entry.etag, "Cache-Control": f"public, max-age={PUBLIC_CACHE_MAX_AGE}"}
+    if public_profiles.etag_matches(if_none_match, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+@router.get("", response_model=ProfileListResponse)
+async def list_profiles(
+    intake_batch: Optional[str] = None,
+    bachelor_course: Optional[str] = None,
+    name: Optional[str] = Query(None, description="Case-insensitive full_name prefix"),
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    if_none_match: Optional[str] = Header(None),
+):
+    try:
+        entry = await public_profiles.cached_profile_page(intake_batch, bachelor_course, name, cursor, limit)
+    except public_profiles.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return cached_json(entry, if_none_match)
+
+@router.get("/{full_name}")
+async def get_profile(full_name: str, if_none_match: Optional[str] = Header(None)):
+    entry = await public_profiles.cached_profile(full_name)
+    if entry.body == b"null":
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return cached_json(entry, if_none_match)
@@ -0,0 +1,140 @@
+import asyncio
+import os
+from typing import Any, Dict, List
+from app.database.db import table, execute, DB_MAX_CONCURRENCY
+
+# Rows sent per upsert request. PostgREST accepts large bodies, but smaller
+# chunks keep a single bad row from costing a big retry.
+DEFAULT_CHUNK_SIZE = int(os.getenv("SUPABASE_CHUNK_SIZE", "500"))
+# Extra attempts for a chunk that failed for a transient reason (connection, timeout, 5xx)
+MAX_CHUNK_RETRIES = int(os.getenv("SUPABASE_CHUNK_RETRIES", "3"))
+# Seconds before the first retry; doubled for every further attempt
+RETRY_BACKOFF_SECONDS = float(os.getenv("SUPABASE_RETRY_BACKOFF_SECONDS", "0.5"))
+# Chunks that may fail outright (retries used up, or an error no split can fix, such as a
+# missing column) before the write is abandoned instead of trying the remaining chunks
+MAX_FAILED_CHUNKS = int(os.getenv("SUPABASE_MAX_FAILED_CHUNKS", "3"))
+
+# Postgres error classes caused by the data of a row: 22 data exception, 23 integrity constraint
+ROW_ERROR_CLASSES = ("22", "23")
+# Postgres error classes worth retrying: 08 connection, 40 rollback (deadlock, serialization),
+# 53 insufficient resources, 57 operator intervention (statement timeout, shutdown);
+# PGRST000-003 are PostgREST failing to reach or use the database
+TRANSIENT_ERROR_CLASSES = ("08", "40", "53", "57")
+TRANSIENT_POSTGREST_CODES = ("PGRST000", "PGRST001", "PGRST002", "PGRST003")
+
+class BulkWriteAborted(Exception):
+    """
+    Raised when more than the allowed number of chunks failed for reasons other than bad rows,
+    e.g. Supabase is unreachable or the table lacks a column. result holds what was done so far.
+    """
+
+    def __init__(self, message: str, result: Dict[str, Any]):
+        super().__init__(message)
+        self.result = result
+
+def classify_error(error: Exception) -> str:
+    """
+    "row" when the rows sent are at fault (splitting the chunk isolates them), "transient" when
+    the same request may succeed later, and "chunk" for anything else, which no retry or split fixes.
+    """
+    code = getattr(error, "code", None)
+    if code is not None:
+        code = str(code)
+        if code.isdigit() and len(code) == 3:
+            # HTTP status from a response that wasn't a PostgREST error body
+            return "transient" if code in ("408", "429") or code >= "500" else "chunk"
+        if code.startswith(ROW_ERROR_CLASSES):
+            return "row"
+        if code.startswith(TRANSIENT_ERROR_CLASSES) or code in TRANSIENT_POSTGREST_CODES:
+            return "transient"
+        return "chunk"
+    # Only needed on this error path; supabase-py depends on httpx, so it is installed
+    import httpx
+    if isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return "transient"
+    if isinstance(error, (ValueError, KeyError, TypeError)):
+        # Raised by the in-memory LocalClient for bad rows (duplicate or missing keys)
+        return "row"
+    return "chunk"
+
+def chunked(rows: List[Any], size: int):
+    """Yield successive slices of rows with at most size items each."""
+    size = max(1, size)
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+async def bulk_upsert(
+    table_name: str,
+    rows: List[Dict[str, Any]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    concurrency: int = DB_MAX_CONCURRENCY,
+    max_failed_chunks: int = MAX_FAILED_CHUNKS,
+) -> Dict[str, Any]:
+    """
+    Upsert rows into table_name in chunks of chunk_size, with up to concurrency chunks in flight.
+    Failures are handled by their cause (see classify_error): transient errors retry the whole
+    chunk with exponential backoff, bad-row errors split the chunk in half until the bad rows
+    are isolated, and other errors fail the chunk as it is. Once more than max_failed_chunks
+    chunks have failed outright the remaining chunks are dropped and BulkWriteAborted is raised.
+    Returns {"written": int, "failed": [{"full_name", "error"}], "round_trips": int}.
+    """
+    result = {"written": 0, "failed": [], "round_trips": 0, "failed_chunks": 0}
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    tasks = [
+        asyncio.ensure_future(_upsert_chunk(table_name, chunk, result, semaphore, max_failed_chunks))
+        for chunk in chunked(rows, chunk_size)
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except BulkWriteAborted:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    del result["failed_chunks"]
+    return result
+
+async def _upsert_chunk(
+    table_name: str,
+    chunk: List[Dict[str, Any]],
+    result: Dict[str, Any],
+    semaphore: asyncio.Semaphore,
+    max_failed_chunks: int,
+):
+    for attempt in range(1 + MAX_CHUNK_RETRIES):
+        if attempt:
+            await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+        result["round_trips"] += 1
+        try:
+            async with semaphore:
+                await execute(table(table_name).upsert(chunk))
+            result["written"] += len(chunk)
+            return
+        except Exception as e:
+            error, kind = e, classify_error(e)
+        if kind != "transient":
+            break
+
+    if kind == "row" and len(chunk) > 1:
+        mid = len(chunk) // 2
+        await _upsert_chunk(table_name, chunk[:mid], result, semaphore, max_failed_chunks)
+        await _upsert_chunk(table_name, chunk[mid:], result, semaphore, max_failed_chunks)
+        return
+    result["failed"].extend({"full_name": row.get("full_name"), "error": str(error)} for row in chunk)
+    if kind != "row":
+        result["failed_chunks"] += 1
+        if result["failed_chunks"] > max_failed_chunks:
+            raise BulkWriteAborted(
+                f"Gave up writing to {table_name} after {result['failed_chunks']} failed chunks: {error}", result
+            )
+
+# Values per in_() filter; the filter is sent in the URL, which has a length limit
+DELETE_CHUNK_SIZE = int(os.getenv("SUPABASE_DELETE_CHUNK_SIZE", "100"))
+
+async def bulk_delete(table_name: str, column: str, values: List[Any], chunk_size: int = DELETE_CHUNK_SIZE) -> int:
+    """Deletes rows whose column is in values, chunking the in_() filter. Returns the number of round trips."""
+    round_trips = 0
+    for chunk in chunked(values, chunk_size):
+        await execute(table(table_name).delete().in_(column, chunk))
+        round_trips += 1
+    return round_trips
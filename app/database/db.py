@@ -0,0 +1,81 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.database.supabase_client import get_client
+from app.services.telemetry import SUPABASE_ERRORS, SUPABASE_REQUEST_SECONDS
+
+# Supabase requests allowed in flight at once. All of them go through the one
+# shared client, whose httpx session keeps a pooled HTTP/2 connection.
+DB_MAX_CONCURRENCY = int(os.getenv("SUPABASE_MAX_CONCURRENCY", "4"))
+
+# Dedicated threads for the blocking supabase-py calls, so they never run on the event loop
+_executor = ThreadPoolExecutor(max_workers=DB_MAX_CONCURRENCY, thread_name_prefix="supabase")
+
+def table(name: str):
+    """Starts a query on a table of the shared client. Building a query does no I/O."""
+    return get_client().table(name)
+
+# PostgREST request methods by the action they carry out
+HTTP_ACTIONS = {"GET": "select", "HEAD": "select", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+def describe_query(query) -> tuple[str, str]:
+    """(table, action) of a built query, the labels its latency is recorded under."""
+    if hasattr(query, "_action"):
+        # LocalClient query
+        return query._table, query._action
+    table_name = getattr(query, "path", "").rsplit("/", 1)[-1] or "unknown"
+    method = getattr(query, "http_method", "")
+    action = HTTP_ACTIONS.get(getattr(method, "value", method), "other")
+    if action == "insert" and "merge-duplicates" in getattr(query, "headers", {}).get("prefer", ""):
+        action = "upsert"
+    return table_name, action
+
+def _timed_execute(query):
+    table_name, action = describe_query(query)
+    start = time.perf_counter()
+    try:
+        return query.execute()
+    except Exception:
+        SUPABASE_ERRORS.inc(table=table_name, action=action)
+        raise
+    finally:
+        SUPABASE_REQUEST_SECONDS.observe(time.perf_counter() - start, table=table_name, action=action)
+
+async def execute(query):
+    """
+    Runs a built query on the Supabase executor and returns its response.
+    Its latency (excluding time queued for a thread) is recorded by table and action.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, _timed_execute, query)
+
+# Rows per page when reading whole tables; PostgREST caps responses at 1000 rows by default
+PAGE_SIZE = int(os.getenv("SUPABASE_PAGE_SIZE", "1000"))
+
+async def iter_pages(table_name: str, columns: str, key: str = "full_name", page_size: int = PAGE_SIZE, query_filter=None):
+    """
+    Yields a table in pages of page_size rows using keyset pagination on key,
+    so large tables are read completely instead of being truncated at the row cap.
+    columns must include key. query_filter, if given, is applied to every page's query.
+    """
+    last = None
+    while True:
+        query = table(table_name).select(columns).order(key).limit(page_size)
+        if query_filter is not None:
+            query = query_filter(query)
+        if last is not None:
+            query = query.gt(key, last)
+        rows = (await execute(query)).data or []
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        last = rows[-1][key]
+
+async def fetch_all(table_name: str, columns: str, key: str = "full_name", page_size: int = PAGE_SIZE) -> list:
+    """Reads every row of a table, page by page."""
+    rows = []
+    async for page in iter_pages(table_name, columns, key, page_size):
+        rows.extend(page)
+    return rows
@@ -0,0 +1,266 @@
+import copy
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+# Tables are keyed on this column, like the unique full_name constraint on profiles and staging
+DEFAULT_PRIMARY_KEY = "full_name"
+
+class LocalResponse:
+    """Mirrors the parts of postgrest's APIResponse the app reads."""
+
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+class LocalStats:
+    """Per-call accounting of what the app sent to and read from the local backend."""
+
+    def __init__(self):
+        self.calls: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(self, call: Dict[str, Any]):
+        with self._lock:
+            self.calls.append(call)
+
+    def reset(self):
+        with self._lock:
+            self.calls = []
+
+    @property
+    def round_trips(self) -> int:
+        return len(self.calls)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Totals per "table.action": calls, rows, bytes sent/received and simulated latency."""
+        totals = defaultdict(lambda: {"calls": 0, "rows": 0, "bytes_sent": 0, "bytes_received": 0, "latency_ms": 0.0})
+        with self._lock:
+            calls = list(self.calls)
+        for call in calls:
+            entry = totals[f"{call['table']}.{call['action']}"]
+            entry["calls"] += 1
+            entry["rows"] += call["rows"]
+            entry["bytes_sent"] += call["bytes_sent"]
+            entry["bytes_received"] += call["bytes_received"]
+            entry["latency_ms"] += call["latency_ms"]
+        return dict(totals)
+
+def _size(payload) -> int:
+    """Bytes of payload as it would go over the wire as JSON."""
+    if payload is None:
+        return 0
+    return len(json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8"))
+
+class _Negation:
+    """Builder returned by .not_ so that the next filter is inverted, as in postgrest."""
+
+    def __init__(self, query: "LocalQuery"):
+        self._query = query
+
+    def __getattr__(self, name):
+        method = getattr(self._query, name)
+
+        def negated(*args, **kwargs):
+            count = len(self._query._filters)
+            method(*args, **kwargs)
+            predicate = self._query._filters[count]
+            self._query._filters[count] = lambda row: not predicate(row)
+            return self._query
+        return negated
+
+class LocalQuery:
+    """
+    In-memory version of the postgrest request builder. Supports the calls the app makes:
+    select/insert/upsert/update/delete, eq/neq/gt/gte/lt/lte/in_/like/ilike/is_/contains/not_,
+    order/limit/range, then execute().
+    """
+
+    def __init__(self, client: "LocalClient", table_name: str):
+        self._client = client
+        self._table = table_name
+        self._action = "select"
+        self._columns = ["*"]
+        self._payload = None
+        self._count = None
+        self._filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self._order: List[tuple] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+
+    # Actions
+    def select(self, columns: str = "*", count: Optional[str] = None):
+        self._action = "select"
+        self._columns = [c.strip() for c in columns.split(",") if c.strip()]
+        self._count = count
+        return self
+
+    def insert(self, rows, **kwargs):
+        self._action, self._payload = "insert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, **kwargs):
+        self._action, self._payload = "upsert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def update(self, values: Dict[str, Any], **kwargs):
+        self._action, self._payload = "update", values
+        return self
+
+    def delete(self, **kwargs):
+        self._action = "delete"
+        return self
+
+    # Filters
+    def _filter(self, predicate):
+        self._filters.append(predicate)
+        return self
+
+    def eq(self, column, value):
+        return self._filter(lambda row: row.get(column) == value)
+
+    def neq(self, column, value):
+        # SQL semantics: NULL never matches a comparison
+        return self._filter(lambda row: row.get(column) is not None and row.get(column) != value)
+
+    def gt(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row[column] > value)
+
+    def gte(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row[column] >= value)
+
+    def lt(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row[column] < value)
+
+    def lte(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row[column] <= value)
+
+    def in_(self, column, values):
+        values = set(values)
+        return self._filter(lambda row: row.get(column) in values)
+
+    def like(self, column, pattern):
+        return self._filter(lambda row: _like(row.get(column), pattern, False))
+
+    def ilike(self, column, pattern):
+        return self._filter(lambda row: _like(row.get(column), pattern, True))
+
+    def is_(self, column, value):
+        expected = None if value in (None, "null") else value
+        return self._filter(lambda row: row.get(column) is expected if expected is None else row.get(column) == expected)
+
+    def contains(self, column, values):
+        return self._filter(lambda row: isinstance(row.get(column), list) and all(v in row[column] for v in values))
+
+    @property
+    def not_(self):
+        return _Negation(self)
+
+    # Modifiers
+    def order(self, column, desc: bool = False, **kwargs):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int, **kwargs):
+        self._limit = size
+        return self
+
+    def range(self, start: int, end: int, **kwargs):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    def _matches(self, row) -> bool:
+        return all(f(row) for f in self._filters)
+
+    def execute(self) -> LocalResponse:
+        return self._client._execute(self)
+
+def _like(value, pattern: str, case_insensitive: bool) -> bool:
+    if not isinstance(value, str):
+        return False
+    regex, escaped = [], False
+    for ch in pattern:
+        if escaped:
+            regex.append(re.escape(ch))
+            escaped = False
+        elif ch == "\\":
+            escaped = True
+        else:
+            regex.append(".*" if ch in "%*" else "." if ch == "_" else re.escape(ch))
+    regex = "".join(regex)
+    flags = re.DOTALL | (re.IGNORECASE if case_insensitive else 0)
+    return re.fullmatch(regex, value, flags) is not None
+
+class LocalClient:
+    """
+    Drop-in stand-in for the supabase Client's table() API, backed by dicts in memory.
+    Every execute() is recorded in .stats (rows and JSON bytes each way) and can be slowed
+    down by latency_ms to mimic a network round trip. Safe to call from several threads.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, primary_keys: Optional[Dict[str, str]] = None):
+        self.latency_ms = latency_ms
+        self.primary_keys = primary_keys or {}
+        self.tables: Dict[str, Dict[Any, Dict[str, Any]]] = defaultdict(dict)
+        self.stats = LocalStats()
+        self._lock = threading.Lock()
+
+    def table(self, table_name: str) -> LocalQuery:
+        return LocalQuery(self, table_name)
+
+    from_ = table
+
+    def seed(self, table_name: str, rows: List[Dict[str, Any]]):
+        """Loads rows into a table without recording a call."""
+        key = self.primary_keys.get(table_name, DEFAULT_PRIMARY_KEY)
+        with self._lock:
+            for row in rows:
+                self.tables[table_name][row[key]] = copy.deepcopy(row)
+
+    def _execute(self, query: LocalQuery) -> LocalResponse:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        with self._lock:
+            data, count = self._apply(query)
+        self.stats.record({
+            "table": query._table,
+            "action": query._action,
+            "rows": len(query._payload) if isinstance(query._payload, list) else len(data),
+            "bytes_sent": _size(query._payload),
+            "bytes_received": _size(data),
+            "latency_ms": self.latency_ms,
+        })
+        return LocalResponse(data, count)
+
+    def _apply(self, query: LocalQuery):
+        table = self.tables[query._table]
+        key = self.primary_keys.get(query._table, DEFAULT_PRIMARY_KEY)
+
+        if query._action in ("insert", "upsert"):
+            for row in query._payload:
+                if query._action == "insert" and row[key] in table:
+                    raise ValueError(f"duplicate key value violates unique constraint on {query._table}.{key}")
+                table[row[key]] = {**table.get(row[key], {}), **copy.deepcopy(row)}
+            return copy.deepcopy(query._payload), None
+
+        matched = [row for row in table.values() if query._matches(row)]
+        if query._action == "update":
+            for row in matched:
+                row.update(copy.deepcopy(query._payload))
+            return copy.deepcopy(matched), None
+        if query._action == "delete":
+            for row in matched:
+                del table[row[key]]
+            return matched, None
+
+        for column, desc in reversed(query._order):
+            matched.sort(key=lambda row: (row.get(column) is None, row.get(column) if row.get(column) is not None else ""), reverse=desc)
+        count = len(matched) if query._count else None
+        end = None if query._limit is None else query._offset + query._limit
+        matched = matched[query._offset:end]
+        if query._columns != ["*"]:
+            matched = [{c: row.get(c) for c in query._columns} for row in matched]
+        return copy.deepcopy(matched), count
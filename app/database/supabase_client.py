@@ -1,16 +1,54 @@
-from supabase import create_client, Client
 import os
+import threading
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
 
+# supabase-py (and its httpx/realtime/auth dependencies) is imported when the client is first
+# needed, so the app can be imported, and start serving, without paying for it or having credentials
+if TYPE_CHECKING:
+    from supabase import Client
+
 load_dotenv(os.path.join(os.path.dirname(__file__), "../../.env"))
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+# "supabase" talks to the real project, "local" uses the in-memory stand-in in local_client.py
+SUPABASE_BACKEND = os.getenv("SUPABASE_BACKEND", "supabase")
+# Simulated round-trip latency for the local backend
+LOCAL_SUPABASE_LATENCY_MS = float(os.getenv("LOCAL_SUPABASE_LATENCY_MS", "0"))
+
+supabase: "Client" = None
+_lock = threading.Lock()
+
+def create_backend_client():
+    """Builds the client for SUPABASE_BACKEND. Raises if the real backend has no credentials."""
+    if SUPABASE_BACKEND == "local":
+        from app.database.local_client import LocalClient
+        return LocalClient(latency_ms=LOCAL_SUPABASE_LATENCY_MS)
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise Exception("Missing SUPABASE_URL or SUPABASE_KEY environment variables")
+    from supabase import create_client
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise Exception("Missing SUPABASE_URL or SUPABASE_KEY environment variables")
+def get_client():
+    """
+    The client every query goes through, created on first use and then shared.
+    Look it up per call so set_client takes effect everywhere.
+    """
+    global supabase
+    if supabase is None:
+        # Queries run on several executor threads; only one of them may build the client
+        with _lock:
+            if supabase is None:
+                supabase = create_backend_client()
+    return supabase
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+def set_client(client):
+    """Swaps the backend, e.g. for a LocalClient in load tests. Returns the previous client (None if never built)."""
+    global supabase
+    with _lock:
+        previous, supabase = supabase, client
+    return previous
 
 # def test_supabase_connection():
 #     try:
@@ -26,4 +64,4 @@ supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 #         print("Exception when querying Supabase:", e)
 
 # if __name__ == "__main__":
-#     test_supabase_connection()
\ No newline at end of file
+#     test_supabase_connection()
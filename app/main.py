@@ -1,6 +1,27 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from app.api import metrics
 from app.api.admin import profiles
+from app.api.public import profiles as public_profiles
+from app.services import upload_jobs
 
-app = FastAPI(title="NUS E-Scholars Admin Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await upload_jobs.start_workers()
+    yield
+    await upload_jobs.stop_workers()
 
-app.include_router(profiles.router)
\ No newline at end of file
+def create_app() -> FastAPI:
+    """
+    Builds the app. Nothing here connects to Supabase or loads the parsing libraries:
+    the client is created by the first query and pandas & co. by the first upload.
+    Serve with uvicorn app.main:app, or uvicorn --factory app.main:create_app for a fresh app.
+    """
+    app = FastAPI(title="NUS E-Scholars Admin Backend", lifespan=lifespan)
+    app.add_middleware(metrics.RequestTimingMiddleware)
+    app.include_router(profiles.router)
+    app.include_router(public_profiles.router)
+    app.include_router(metrics.router)
+    return app
+
+app = create_app()
@@ -6,6 +6,45 @@ class UploadCSVResponse(BaseModel):
     uploadId: str
     status: str
     submittedAt: datetime
+    reused: bool = False
+
+class UploadProgress(BaseModel):
+    rowsRead: int = 0
+    deduped: int = 0
+    duplicates: int = 0
+    staged: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    failed: int = 0
+    flagged: int = 0
+    existing: int = 0
+    brokenPictures: int = 0
+    nearDuplicates: int = 0
+
+class FailedRow(BaseModel):
+    fullName: Optional[str] = None
+    error: str
+
+class UploadStatusResponse(BaseModel):
+    uploadId: str
+    filename: Optional[str] = None
+    status: str
+    submittedAt: datetime
+    startedAt: Optional[datetime] = None
+    finishedAt: Optional[datetime] = None
+    progress: UploadProgress
+    rowsPerSecond: Optional[float] = None
+    roundTrips: int = 0
+    unknownHeaders: List[str] = []
+    ambiguousHeaders: Dict[str, List[str]] = {}
+    contentHash: Optional[str] = None
+    timings: Dict[str, float] = {}
+    failedRows: List[FailedRow] = []  # the first few rows staging rejected; progress.failed has the count
+    error: Optional[str] = None
+
+class ProfileListResponse(BaseModel):
+    items: List[Dict[str, Any]]
+    nextCursor: Optional[str] = None
 
 class FlaggedProfile(BaseModel):
     profileId: str
@@ -14,9 +53,30 @@ class FlaggedProfile(BaseModel):
 
 class EditFlaggedProfileRequest(BaseModel):
     profileId: str
-    updatedData: Dict[str, Any]
+    updatedData: Dict[str, Any] = {}
     submittedAt: datetime
+    dismissIssues: List[str] = []  # possible-duplicate or broken-picture issues the reviewer rules out
+
+class FlaggedProfilePage(BaseModel):
+    items: List[FlaggedProfile]
+    nextCursor: Optional[str] = None
 
 class EditFlaggedProfileResponse(BaseModel):
     status: str
-    profileId: str
\ No newline at end of file
+    profileId: str
+    issues: List[str] = []
+    error: Optional[str] = None
+
+class PromotionStatusResponse(BaseModel):
+    promotionId: str
+    status: str
+    dryRun: bool
+    includeFlagged: bool
+    submittedAt: datetime
+    finishedAt: Optional[datetime] = None
+    counts: Dict[str, int]
+    timings: Dict[str, float]
+    roundTrips: int = 0
+    diff: Optional[Dict[str, Any]] = None
+    failed: List[Dict[str, Any]] = []
+    error: Optional[str] = None
@@ -1,33 +1,33 @@
-from app.database.supabase_client import supabase
+import asyncio
+from app.database.db import iter_pages
+from app.services.name_index import get_name_index
 
 PROFILES_TABLE = "profiles"
 STAGING_TABLE = "staging"
 
-def get_all_names(table):
-    """Fetch all full_name values from a table."""
-    response = supabase.table(table).select("full_name").execute()
-    if hasattr(response, "data"):
-        return set(row['full_name'].strip() for row in response.data if row['full_name'] and row['full_name'].strip())
-    elif isinstance(response, dict) and 'data' in response:
-        return set(row['full_name'].strip() for row in response['data'] if row['full_name'] and row['full_name'].strip())
-    else:
-        return set()
+async def get_all_names(table):
+    """Fetch all full_name values from a table, page by page."""
+    names = set()
+    async for page in iter_pages(table, "full_name"):
+        names.update(row['full_name'].strip() for row in page if row['full_name'] and row['full_name'].strip())
+    return names
 
-def compare_profiles_and_staging():
-    profiles_names = get_all_names(PROFILES_TABLE)
-    staging_names = get_all_names(STAGING_TABLE)
+async def compare_profiles_and_staging():
+    profiles_index, staging_names = await asyncio.gather(
+        get_name_index(PROFILES_TABLE), get_all_names(STAGING_TABLE)
+    )
 
     # Names in staging that already exist in profiles
-    existing_names = [name for name in staging_names if name in profiles_names]
+    existing_names = [name for name in staging_names if name in profiles_index]
 
     # Names in staging that are new (not in profiles)
-    new_names = [name for name in staging_names if name not in profiles_names]
+    new_names = [name for name in staging_names if name not in profiles_index]
 
     return existing_names, new_names
 
 if __name__ == "__main__":
-    exist, new = compare_profiles_and_staging()
+    exist, new = asyncio.run(compare_profiles_and_staging())
     print("Existing names in profiles:")
     print(exist)
     print("\nNew names (not in profiles):")
-    print(new)
\ No newline at end of file
+    print(new)
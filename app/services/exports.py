@@ -0,0 +1,93 @@
+# Exports the profiles or staging table as CSV or XLSX for the admin panel.
+# The table is read page by page with keyset pagination and each page is written out as it
+# arrives, so memory stays flat however large the table is. Columns follow PROFILE_COLUMNS and
+# list fields are JSON-encoded like the migration's CSV (json_to_csv.csv_row), so an export can be
+# loaded back the same way.
+
+import asyncio
+import csv
+import io
+import json
+import time
+from typing import Any, AsyncIterator, Dict, List
+from app.database.db import PAGE_SIZE, iter_pages
+from app.services.json_to_csv import LIST_COLUMNS, PROFILE_COLUMNS
+from app.services.profile_service import STAGING_COLUMNS
+from app.services.telemetry import EXPORT_ROWS, log_event
+
+EXPORT_TABLES = ("profiles", "staging")
+# Columns holding lists, written as JSON arrays
+JSON_COLUMNS = set(LIST_COLUMNS) | {"issues"}
+# Longest text an Excel cell holds
+XLSX_MAX_CELL_CHARS = 32767
+
+def export_columns(table_name: str) -> List[str]:
+    """PROFILE_COLUMNS for profiles; for staging the ones it has, then its issues."""
+    if table_name == "profiles":
+        return list(PROFILE_COLUMNS)
+    if table_name == "staging":
+        return [c for c in PROFILE_COLUMNS if c in STAGING_COLUMNS] + ["issues"]
+    raise ValueError(f"Cannot export table: {table_name}")
+
+def export_values(row: Dict[str, Any], columns: List[str]) -> List[Any]:
+    """A row's values in column order, with list fields encoded as in json_to_csv.csv_row."""
+    values = []
+    for column in columns:
+        value = row.get(column)
+        if column in JSON_COLUMNS and value is not None:
+            value = json.dumps(value, ensure_ascii=False)
+        values.append(value)
+    return values
+
+def _record(table_name: str, file_format: str, rows: int, start: float):
+    EXPORT_ROWS.inc(rows, table=table_name, format=file_format)
+    log_event("export_completed", table=table_name, format=file_format, rows=rows, seconds=round(time.perf_counter() - start, 3))
+
+async def iter_csv(table_name: str, page_size: int = PAGE_SIZE) -> AsyncIterator[bytes]:
+    """Yields a table as UTF-8 CSV: the header first, then one chunk per page of rows."""
+    columns = export_columns(table_name)
+    start = time.perf_counter()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue().encode("utf-8")
+    rows = 0
+    async for page in iter_pages(table_name, ",".join(columns), page_size=page_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(export_values(row, columns) for row in page)
+        rows += len(page)
+        yield buffer.getvalue().encode("utf-8")
+    _record(table_name, "csv", rows, start)
+
+def _xlsx_cell(value):
+    """Text Excel can store: control characters removed and cut to the cell limit."""
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub("", value)[:XLSX_MAX_CELL_CHARS]
+    return value
+
+def _append_rows(sheet, page: List[Dict[str, Any]], columns: List[str]):
+    for row in page:
+        sheet.append([_xlsx_cell(value) for value in export_values(row, columns)])
+
+async def write_xlsx(table_name: str, path: str, page_size: int = PAGE_SIZE) -> int:
+    """
+    Writes a table to an XLSX file at path and returns the number of rows.
+    The workbook is write-only, so openpyxl spools rows to disk instead of keeping them;
+    appending and saving run on the default executor.
+    """
+    import openpyxl
+    columns = export_columns(table_name)
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(table_name)
+    sheet.append(columns)
+    rows = 0
+    async for page in iter_pages(table_name, ",".join(columns), page_size=page_size):
+        await loop.run_in_executor(None, _append_rows, sheet, page, columns)
+        rows += len(page)
+    await loop.run_in_executor(None, workbook.save, path)
+    _record(table_name, "xlsx", rows, start)
+    return rows
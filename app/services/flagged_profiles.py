@@ -0,0 +1,185 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from app.database.db import table, execute
+from app.database.bulk import bulk_upsert, chunked, DEFAULT_CHUNK_SIZE, DELETE_CHUNK_SIZE
+from app.services.profile_service import (
+    NEAR_DUPLICATE_ISSUE,
+    STAGING_COLUMNS,
+    build_staging_row,
+    clean_row_fields,
+    detect_and_fix_issues,
+    staging_write_lock,
+)
+from app.services.picture_links import (
+    BROKEN_PICTURE_ISSUE, PICTURE_CHECK_MODE, normalize_picture_url, picture_checker, url_problem,
+)
+from app.services.public_profiles import decode_cursor, encode_cursor
+from app.services.telemetry import log_event
+from app.services.upload_cache import bump_staging_version
+
+STAGING_TABLE = "staging"
+DEFAULT_FLAGGED_PAGE_SIZE = 50
+MAX_FLAGGED_PAGE_SIZE = 500
+# Columns a reviewer may edit; the rest are keys or derived from the row
+EDITABLE_COLUMNS = STAGING_COLUMNS - {"full_name", "issues", "content_hash", "last_modified"}
+# Issues whose messages go on with details ("Possible duplicate of 'Tan Weiming' in profiles (same letters)"),
+# so filtering on them matches by prefix
+PREFIX_ISSUES = (NEAR_DUPLICATE_ISSUE,)
+
+def is_dismissable(issue: str) -> bool:
+    """
+    Whether a reviewer may dismiss an issue: the ones kept across edits (a possible duplicate, a
+    broken picture) rather than re-detected from the row, which a reviewer clears by fixing the row.
+    """
+    return issue == BROKEN_PICTURE_ISSUE or issue.startswith(NEAR_DUPLICATE_ISSUE)
+
+def _dismissed(issue: str, dismissals) -> bool:
+    """Whether issue is one of dismissals, or starts with one of them that is in PREFIX_ISSUES."""
+    return issue in dismissals or any(issue.startswith(prefix) for prefix in dismissals if prefix in PREFIX_ISSUES)
+
+async def list_flagged_profiles(issue: Optional[str] = None, cursor: Optional[str] = None, limit: int = DEFAULT_FLAGGED_PAGE_SIZE) -> Dict[str, Any]:
+    """
+    One page of staging rows that have issues, ordered by full_name with a keyset cursor.
+    issue, if given, keeps only rows flagged with that exact issue message, or for PREFIX_ISSUES
+    with any message starting with it. A prefix can't be matched inside the issues array by the
+    query, so flagged rows are then read limit + 1 at a time and filtered here until a page is full.
+    """
+    prefix = issue if issue in PREFIX_ISSUES else None
+    after = decode_cursor(cursor) if cursor else None
+    rows = []
+    while True:
+        query = table(STAGING_TABLE).select("*").not_.is_("issues", "null").order("full_name").limit(limit + 1)
+        if issue and not prefix:
+            query = query.contains("issues", [issue])
+        if after is not None:
+            query = query.gt("full_name", after)
+        page = (await execute(query)).data or []
+        if prefix is None:
+            rows = page
+            break
+        rows += [row for row in page if any(message.startswith(prefix) for message in row["issues"] or [])]
+        if len(page) <= limit or len(rows) > limit:
+            break
+        after = page[-1]["full_name"]
+    next_cursor = encode_cursor(rows[limit - 1]["full_name"]) if len(rows) > limit else None
+    items = [
+        {"profileId": row["full_name"], "data": {k: v for k, v in row.items() if k != "issues"}, "issues": row["issues"] or []}
+        for row in rows[:limit]
+    ]
+    return {"items": items, "nextCursor": next_cursor}
+
+async def fetch_staging_rows(names: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Staging rows by full_name, read with one in_() query per DELETE_CHUNK_SIZE names."""
+    rows = {}
+    for chunk in chunked(names, DELETE_CHUNK_SIZE):
+        for row in (await execute(table(STAGING_TABLE).select("*").in_("full_name", chunk))).data or []:
+            rows[row["full_name"]] = row
+    return rows
+
+def _submitted_at(edit: Dict[str, Any]) -> datetime:
+    """An edit's submittedAt as an aware UTC datetime; naive times (and ISO strings without an offset) are taken as UTC."""
+    submitted = edit["submittedAt"]
+    if isinstance(submitted, str):
+        submitted = datetime.fromisoformat(submitted)
+    if submitted.tzinfo is None:
+        return submitted.replace(tzinfo=timezone.utc)
+    return submitted.astimezone(timezone.utc)
+
+async def apply_profile_edits(edits: List[Dict[str, Any]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[Dict[str, Any]]:
+    """
+    Applies reviewer edits to staged profiles. Each edit is {"profileId", "updatedData", "submittedAt"}
+    and optionally "dismissIssues"; edits to the same profile are merged in submittedAt order.
+    Every edited row is cleaned and re-checked with detect_and_fix_issues, and all changed rows are
+    written in one bulk upsert.
+    Near-duplicate name issues are kept, since the name can't be edited here; so is a broken
+    picture issue unless picture_url was edited, in which case the new link is normalised and
+    re-checked (fetched too when PICTURE_CHECK_MODE is "check"). Either is dropped when listed in
+    dismissIssues (see is_dismissable), e.g. a false-positive duplicate; "Possible duplicate of"
+    dismisses every near-duplicate issue of the row.
+    Returns one result per profile: {"status", "profileId", "issues", "error"} where status is
+    resolved, flagged (issues remain), unchanged, rejected, not_found or failed.
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    updates: Dict[str, Dict[str, Any]] = {}
+    dismissals: Dict[str, set] = {}
+    # Clients may send times with and without an offset, which can't be compared as they are
+    for edit in sorted(edits, key=_submitted_at):
+        profile_id = edit["profileId"]
+        result = results.setdefault(profile_id, {"status": None, "profileId": profile_id, "issues": [], "error": None})
+        if result["status"] == "rejected":
+            continue
+        data = dict(edit.get("updatedData") or {})
+        dismiss = edit.get("dismissIssues") or []
+        if data.get("full_name", profile_id) != profile_id:
+            result["status"], result["error"] = "rejected", "full_name cannot be changed here"
+            continue
+        data.pop("full_name", None)
+        unknown = sorted(set(data) - EDITABLE_COLUMNS)
+        if unknown:
+            result["status"], result["error"] = "rejected", f"Columns cannot be edited: {', '.join(unknown)}"
+            continue
+        kept = [issue for issue in dismiss if not is_dismissable(issue)]
+        if kept:
+            result["status"], result["error"] = "rejected", f"Issues cannot be dismissed, fix the row instead: {'; '.join(kept)}"
+            continue
+        updates.setdefault(profile_id, {}).update(data)
+        dismissals.setdefault(profile_id, set()).update(dismiss)
+
+    # Rows are read, re-checked and written back without an upload syncing staging in between
+    async with staging_write_lock:
+        await _write_updates(results, updates, dismissals, chunk_size)
+    return list(results.values())
+
+async def _write_updates(
+    results: Dict[str, Dict[str, Any]], updates: Dict[str, Dict[str, Any]], dismissals: Dict[str, set], chunk_size: int
+):
+    current = await fetch_staging_rows([p for p in updates if results[p]["status"] is None])
+    now = datetime.utcnow().isoformat()
+    edited = []
+    for profile_id, data in updates.items():
+        result = results[profile_id]
+        if result["status"] is not None:
+            continue
+        row = current.get(profile_id)
+        if row is None:
+            result["status"], result["error"] = "not_found", "No staged profile with this name"
+            continue
+        data = clean_row_fields(data)
+        if "picture_url" in data:
+            data["picture_url"] = normalize_picture_url(data["picture_url"])
+        issues, fixed_row = detect_and_fix_issues({**row, **data})
+        kept = [issue for issue in row.get("issues") or [] if issue.startswith(NEAR_DUPLICATE_ISSUE)]
+        if "picture_url" not in data and BROKEN_PICTURE_ISSUE in (row.get("issues") or []):
+            kept.append(BROKEN_PICTURE_ISSUE)
+        kept = [issue for issue in kept if not _dismissed(issue, dismissals[profile_id])]
+        edited.append((profile_id, row, data, fixed_row, issues + kept))
+
+    urls = {data["picture_url"] for _, _, data, _, _ in edited if data.get("picture_url")}
+    problems = {url: url_problem(url) for url in urls}
+    if urls and PICTURE_CHECK_MODE == "check":
+        problems = await picture_checker.check(problems)
+
+    to_write = []
+    for profile_id, row, data, fixed_row, issues in edited:
+        result = results[profile_id]
+        if problems.get(data.get("picture_url")):
+            issues.append(BROKEN_PICTURE_ISSUE)
+        staging_row = build_staging_row(fixed_row, issues)
+        result["issues"] = issues
+        if staging_row["content_hash"] == row.get("content_hash"):
+            result["status"] = "unchanged"
+            continue
+        staging_row["last_modified"] = now
+        result["status"] = "flagged" if issues else "resolved"
+        to_write.append(staging_row)
+
+    if to_write:
+        write_result = await bulk_upsert(STAGING_TABLE, to_write, chunk_size=chunk_size)
+        bump_staging_version()
+        for failure in write_result["failed"]:
+            result = results[failure["full_name"]]
+            result["status"], result["error"] = "failed", failure["error"]
+        log_event(
+            "flagged_edits_applied", profiles=len(updates), written=write_result["written"],
+            failed=len(write_result["failed"]), roundTrips=write_result["round_trips"],
+        )
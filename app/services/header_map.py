@@ -0,0 +1,192 @@
+import hashlib
+import math
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Sequence
+
+# Comprehensive mapping for column names to snake_case, handling different versions of forms
+COLUMN_NAME_MAP = {
+    # Names/IDs
+    "Name": "full_name",
+    "Full Name (as per NRIC)": "full_name",
+    
+    # Course/Programme: "B.Eng. Major" / "Major" are resolved through COLUMN_PRECEDENCE
+
+    # Masters (if any)
+    "Major (in full)": "masters_course",
+
+    # DDP/Minor
+    "Special Programmes (DDP outside of CDE, Second Majors, Minors)": "ddp_or_minor",
+    "Specialisation in ...": "ddp_or_minor",  # for variants
+    "Second Major in ...": "ddp_or_minor",
+    "Minor in ...": "ddp_or_minor",
+
+    # Intake batch
+    "Year of Admission": "intake_batch",
+
+    # Overseas Experience
+    "(If applicable) Where did you go (or will be going) for SEP/summer/winter (school), NOC (location and company), internships (company)": "overseas_experience",
+
+    # Write-up
+    "Please provide a short write-up of yourself.": "self_writeup",
+    "Self write-up (e.g. Yuxuan's self write-up below). It'll be publicly available so you can also use it as a personal showcase page! (Limit: 200 words)": "self_writeup",
+
+    # Photo
+    "Upload a picture of yourself.": "picture_url",
+    "Upload a picture of yourself! Example on the right": "picture_url",
+
+    # Achievements
+    "Notable Achievements (max 3)": "notable_achievements",
+    "Notable Achievements (if any, up to 3!) Example on the right": "notable_achievements",
+
+    # Hobbies
+    "Any interests/ hobbies (max 3)": "hobbies",
+    "Any interests/hobbies? (Up to 3!) Example on the right": "hobbies",
+
+    # Socials
+    "Linkedin Profile URL": "linkedin_link",
+    "LinkedIn Link (if any)": "linkedin_link",
+    "Instagram Profile URL": "instagram_link",
+    "Instagram Link (if any)": "instagram_link",
+    "Github Profile URL": "github_link",
+}
+
+# Targets fed by several headers, with the headers in precedence order.
+# For each row the first of these columns with a value wins (see JOINED_TARGETS for the exception);
+# columns not listed come after, in file order.
+COLUMN_PRECEDENCE = {
+    "bachelor_course": ["B.Eng. Major", "Major"],
+    "ddp_or_minor": [
+        "Special Programmes (DDP outside of CDE, Second Majors, Minors)",
+        "Specialisation in ...",
+        "Second Major in ...",
+        "Minor in ...",
+    ],
+}
+
+# Targets whose columns each hold a separate answer (a second major and a minor): when several
+# are filled, all of them are kept, joined with this separator in precedence order
+JOINED_TARGETS = {"ddp_or_minor": "; "}
+
+# Headers Google Forms adds that are expected and never staged
+IGNORED_HEADERS = {"Timestamp", "Email Address"}
+
+# Target names a header may already use as-is (e.g. a re-imported export)
+KNOWN_TARGETS = set(COLUMN_NAME_MAP.values()) | set(COLUMN_PRECEDENCE)
+
+# Resolved projections kept per header fingerprint
+MAX_CACHED_PROJECTIONS = int(os.getenv("MAX_CACHED_HEADER_PROJECTIONS", "32"))
+# Changes whenever the mapping rules above change; part of the upload cache key
+MAPPING_VERSION = hashlib.sha1(repr((
+    sorted(COLUMN_NAME_MAP.items()), sorted(COLUMN_PRECEDENCE.items()), sorted(JOINED_TARGETS.items()),
+    sorted(IGNORED_HEADERS),
+)).encode("utf-8")).hexdigest()[:12]
+
+def has_value(value) -> bool:
+    """Whether a cell holds an answer: non-blank strings and any non-missing non-string value."""
+    if isinstance(value, str):
+        return value.strip() != ""
+    return value is not None and not (isinstance(value, float) and math.isnan(value))
+
+def combine_values(target: str, values: Sequence[Any]) -> Any:
+    """
+    The value of target from its source values in precedence order: the first with a value,
+    or for JOINED_TARGETS every distinct one (ignoring case) with a value, joined.
+    The first value if none has one.
+    """
+    filled = [value for value in values if has_value(value)]
+    if not filled:
+        return values[0]
+    if len(filled) > 1 and target in JOINED_TARGETS:
+        # The same answer under two headers ("Minor in ..." twice) is kept once, as first written
+        distinct = {}
+        for value in filled:
+            text = str(value).strip()
+            distinct.setdefault(text.casefold(), text)
+        return JOINED_TARGETS[target].join(distinct.values())
+    return filled[0]
+
+class HeaderProjection:
+    """
+    A compiled mapping from a header row to target columns.
+    sources maps each target to the indexes of the columns feeding it, in precedence order.
+    """
+
+    def __init__(self, fingerprint: str, headers: List[str], sources: Dict[str, List[int]], unknown: List[str], ambiguous: Dict[str, List[str]]):
+        self.fingerprint = fingerprint
+        self.headers = headers
+        self.sources = sources
+        self.unknown = unknown
+        self.ambiguous = ambiguous
+
+    def project(self, values: Sequence[Any]) -> Dict[str, Any]:
+        """Maps one row of values (in header order) to a dict of target columns."""
+        row = {}
+        for target, indexes in self.sources.items():
+            if len(indexes) > 1:
+                row[target] = combine_values(target, [values[index] for index in indexes])
+            else:
+                row[target] = values[indexes[0]]
+        return row
+
+    def report(self) -> Dict[str, Any]:
+        """Unknown and ambiguous headers, for surfacing to the uploader."""
+        return {"unknownHeaders": list(self.unknown), "ambiguousHeaders": dict(self.ambiguous)}
+
+_projections: "OrderedDict[str, HeaderProjection]" = OrderedDict()
+
+def header_fingerprint(headers: Sequence[str]) -> str:
+    return hashlib.sha1("\x1f".join(str(h) for h in headers).encode("utf-8")).hexdigest()
+
+def _target(header: str):
+    if header in COLUMN_NAME_MAP:
+        return COLUMN_NAME_MAP[header]
+    for target, precedence in COLUMN_PRECEDENCE.items():
+        if header in precedence:
+            return target
+    if header in KNOWN_TARGETS:
+        return header
+    return None
+
+def _compile(fingerprint: str, headers: List[str]) -> HeaderProjection:
+    grouped: Dict[str, List[int]] = {}
+    unknown = []
+    for index, header in enumerate(headers):
+        target = _target(header)
+        if target is None:
+            if header not in IGNORED_HEADERS:
+                unknown.append(header)
+            continue
+        grouped.setdefault(target, []).append(index)
+
+    sources = {}
+    ambiguous = {}
+    for target, indexes in grouped.items():
+        if len(indexes) > 1:
+            precedence = COLUMN_PRECEDENCE.get(target)
+            if precedence:
+                rank = {header: i for i, header in enumerate(precedence)}
+                indexes = sorted(indexes, key=lambda i: (rank.get(headers[i], len(rank)), i))
+            else:
+                # No rule for this target: later columns win, as they did when rows were dicts
+                indexes = sorted(indexes, reverse=True)
+                ambiguous[target] = [headers[i] for i in indexes]
+        sources[target] = indexes
+    return HeaderProjection(fingerprint, headers, sources, unknown, ambiguous)
+
+def resolve_headers(headers: Sequence[str]) -> HeaderProjection:
+    """
+    Returns the projection for a header row, compiling it on first sight.
+    Projections are cached by header fingerprint, so later uploads of the same form version skip resolution.
+    """
+    headers = [str(h) for h in headers]
+    fingerprint = header_fingerprint(headers)
+    projection = _projections.get(fingerprint)
+    if projection is None:
+        projection = _compile(fingerprint, headers)
+        _projections[fingerprint] = projection
+        while len(_projections) > MAX_CACHED_PROJECTIONS:
+            _projections.popitem(last=False)
+    else:
+        _projections.move_to_end(fingerprint)
+    return projection
@@ -1,41 +1,59 @@
-# Convert existing json to csv and populate supabase table 'profiles'
+# Migrate the existing database.json (AY -> faculty -> student) into supabase table 'profiles'
 # Intended to be the first init for subsequent updates via admin panel
 # Run python -m app.services.json_to_csv from root directory
+#   --csv PATH   also write the normalised rows to a CSV file
+#   --restart    ignore the checkpoint left by an interrupted run
+#   --legacy     old behaviour: write CSV, wipe the table, then load the CSV back
 
+import argparse
+import asyncio
 import json
 import csv
+import os
 import re
 from datetime import datetime, timezone, timedelta
-from app.database.supabase_client import supabase
+from typing import Any, Dict, Iterator, Tuple
+from app.database.db import table, execute, fetch_all
+from app.database.bulk import bulk_upsert, bulk_delete, DEFAULT_CHUNK_SIZE
+from app.services.name_index import invalidate_name_index
+from app.services.public_profiles import invalidate_public_cache
 
 INPUT_JSON = "./data/database.json"
 OUTPUT_CSV = "./data/database_profiles.csv"
+CHECKPOINT_FILE = "./data/database_migration.checkpoint.json"
 PROFILE_COLUMNS = [
     "full_name", "bachelor_course", "masters_course", "ddp_or_minor",
     "intake_batch", "overseas_experience", "self_writeup", "picture_url",
     "notable_achievements", "hobbies", "linkedin_link",
     "instagram_link", "github_link", "updated_at", "last_modified"
 ]
+LIST_COLUMNS = ("notable_achievements", "hobbies")
 PROFILES_TABLE = "profiles"
 LAST_MODIFIED_DATE = '2024-09-30'
+# Characters read from the JSON file at a time
+JSON_READ_CHARS = int(os.getenv("MIGRATION_READ_CHARS", str(1 << 16)))
+# Rows upserted (and checkpointed) together; each batch goes out in DEFAULT_CHUNK_SIZE chunks
+MIGRATION_BATCH_ROWS = int(os.getenv("MIGRATION_BATCH_ROWS", "2000"))
+# Admin endpoint of the running API that drops its profile caches, e.g.
+# http://127.0.0.1:8000/admin/profiles/cache/invalidate. The API caches expire on their own otherwise.
+CACHE_INVALIDATE_URL = os.getenv("PROFILES_CACHE_INVALIDATE_URL")
 
-def clear_profiles_table():
+async def clear_profiles_table():
     # Delete all rows in the profiles table
-    supabase.table(PROFILES_TABLE).delete().neq("full_name", "").execute()
+    await execute(table(PROFILES_TABLE).delete().neq("full_name", ""))
     print("Cleared all rows in 'profiles' table.")
 
-def insert_profiles_from_csv():
+async def insert_profiles_from_csv():
     with open(OUTPUT_CSV, newline='', encoding='utf-8') as f:
         reader = csv.DictReader(f)
         rows = list(reader)
         # Remove empty rows (if any)
         rows = [row for row in rows if row.get("full_name")]
-        # Insert in batches if needed
-        batch_size = 1000
-        for i in range(0, len(rows), batch_size):
-            batch = rows[i:i+batch_size]
-            supabase.table(PROFILES_TABLE).upsert(batch).execute()
-    print(f"Inserted {len(rows)} rows into 'profiles' table.")
+    # Insert in batches, several in flight at once
+    result = await bulk_upsert(PROFILES_TABLE, rows, chunk_size=1000)
+    print(f"Inserted {result['written']} rows into 'profiles' table in {result['round_trips']} round trips.")
+    for failure in result["failed"]:
+        print(f"Failed to insert '{failure['full_name']}': {failure['error']}")
 
 def split_bullet_points(text):
     """
@@ -71,60 +89,275 @@ def extract_ay(admit_year):
     match = re.search(r"AY\d{2}/\d{2}", str(admit_year))
     return match.group(0) if match else None
 
-def main():
-    with open(INPUT_JSON, "r", encoding="utf-8") as f:
+def to_points(value):
+    """Notable achievements / hobbies as a list of capitalised points."""
+    if isinstance(value, list):
+        points = [str(x) for x in value]
+    else:
+        points = split_bullet_points(value)
+    return capitalise_first_word(points)
+
+def build_profile_row(entry: Dict[str, Any], updated_at: str) -> Dict[str, Any]:
+    """Normalises one student entry of database.json into a profiles row (list fields as lists)."""
+    row = {}
+    row["full_name"] = entry.get("name") or entry.get("full_name")
+    row["bachelor_course"] = entry.get("major", "")
+    row["masters_course"] = entry.get("masters_course", "")
+    row["ddp_or_minor"] = entry.get("ddp_or_minor", "")
+    row["intake_batch"] = extract_ay(entry.get("admit_year"))
+    row["overseas_experience"] = entry.get("overseas_experience", "")
+    row["self_writeup"] = entry.get("self_writeup") or entry.get("writeup", "")
+    row["picture_url"] = entry.get("picture_url", "")
+    row["notable_achievements"] = to_points(entry.get("notable_achievements", ""))
+    row["hobbies"] = to_points(entry.get("interests_hobbies", ""))
+    row["linkedin_link"] = entry.get("linkedin_link") or entry.get("linkedin_url", "")
+    row["instagram_link"] = entry.get("instagram_link") or entry.get("instagram_url", "")
+    row["github_link"] = entry.get("github_url", "")
+    row["updated_at"] = updated_at
+    row["last_modified"] = LAST_MODIFIED_DATE
+    return {k: row.get(k, "") for k in PROFILE_COLUMNS}
+
+def csv_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """A profiles row as written to the CSV export, with list fields JSON-encoded."""
+    return {k: json.dumps(v, ensure_ascii=False) if k in LIST_COLUMNS else v for k, v in row.items()}
+
+class JsonObjectStream:
+    """
+    Reads nested JSON objects from a text file a block at a time.
+    Keys are walked one by one and values are decoded with raw_decode as soon as they
+    are complete, so only the current value (one student entry) is ever held in memory.
+    """
+
+    def __init__(self, f, read_chars: int = JSON_READ_CHARS):
+        self._file = f
+        self._read_chars = read_chars
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        block = self._file.read(self._read_chars)
+        if not block:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + block
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Next non-whitespace character, without consuming it ('' at end of file)."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buf) or not self._fill():
+                return self._buf[self._pos:self._pos + 1]
+
+    def _expect(self, char: str):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' in JSON, found {found!r}")
+        self._pos += 1
+
+    def decode(self):
+        """Decodes the next complete JSON value, reading more of the file until it is whole."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the end of the block may continue in the next one
+            if end == len(self._buf) and not isinstance(value, (dict, list, str)) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def iter_keys(self) -> Iterator[str]:
+        """Walks the keys of the next object. The caller must consume each key's value before the next key."""
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.decode()
+            self._expect(":")
+            yield key
+            separator = self._peek()
+            self._pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or '}}' in JSON, found {separator!r}")
+
+def iter_student_entries(path: str = INPUT_JSON) -> Iterator[Tuple[str, str, str, Dict[str, Any]]]:
+    """Yields (ay, faculty, student_id, entry) from database.json without loading the whole file."""
+    with open(path, "r", encoding="utf-8") as f:
+        stream = JsonObjectStream(f)
+        for ay in stream.iter_keys():
+            for faculty in stream.iter_keys():
+                for student_id in stream.iter_keys():
+                    yield ay, faculty, student_id, stream.decode()
+
+def _source_signature(path: str) -> Dict[str, Any]:
+    stat = os.stat(path)
+    return {"source": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+def load_checkpoint(path: str, checkpoint_file: str = CHECKPOINT_FILE) -> Dict[str, Any]:
+    """The checkpoint of an interrupted run over the same, unchanged input file (None if there is none)."""
+    try:
+        with open(checkpoint_file, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    signature = _source_signature(path)
+    if any(checkpoint.get(k) != v for k, v in signature.items()):
+        print("Ignoring checkpoint: the input file has changed since it was written.")
+        return None
+    return checkpoint
+
+def save_checkpoint(checkpoint: Dict[str, Any], checkpoint_file: str = CHECKPOINT_FILE):
+    # Written to a temp file first so an interruption never leaves a half-written checkpoint
+    tmp = checkpoint_file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, checkpoint_file)
+
+async def reconcile_deletions(loaded_names: set) -> int:
+    """Deletes profiles whose full_name is no longer in the source. Returns the number deleted."""
+    existing = await fetch_all(PROFILES_TABLE, "full_name")
+    stale = [row["full_name"] for row in existing if row["full_name"] not in loaded_names]
+    if stale:
+        await bulk_delete(PROFILES_TABLE, "full_name", stale)
+    return len(stale)
+
+def notify_profiles_changed():
+    """Drops the profile caches in this process and, if configured, in the running API."""
+    invalidate_name_index(PROFILES_TABLE)
+    invalidate_public_cache()
+    if not CACHE_INVALIDATE_URL:
+        return
+    # Imported here so the admin export, which shares this module's columns, doesn't load httpx
+    import httpx
+    try:
+        httpx.post(CACHE_INVALIDATE_URL, timeout=10).raise_for_status()
+        print(f"Invalidated profile caches at {CACHE_INVALIDATE_URL}.")
+    except httpx.HTTPError as e:
+        print(f"Could not invalidate profile caches at {CACHE_INVALIDATE_URL}: {e}")
+
+async def migrate(
+    path: str = INPUT_JSON,
+    csv_path: str = None,
+    batch_rows: int = MIGRATION_BATCH_ROWS,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    resume: bool = True,
+    checkpoint_file: str = CHECKPOINT_FILE,
+) -> Dict[str, Any]:
+    """
+    Streams database.json into 'profiles' with batched upserts, then deletes profiles that
+    are no longer in the file. The table is never emptied, so the site keeps serving profiles.
+    After each batch the number of entries done is checkpointed; a rerun over the same file
+    skips those entries (re-reading them only to collect names and the CSV side output).
+    """
+    checkpoint = load_checkpoint(path, checkpoint_file) if resume else None
+    skip = checkpoint["entries_done"] if checkpoint else 0
+    if skip:
+        print(f"Resuming after {skip} entries from {checkpoint_file}.")
+    checkpoint = {**_source_signature(path), "entries_done": skip}
+    updated_at = (datetime.now(timezone.utc) - timedelta(days=365)).isoformat()
+    result = {"entries": 0, "written": 0, "skipped": skip, "deleted": 0, "failed": [], "round_trips": 0}
+    loaded_names = set()
+    pending: Dict[str, Dict[str, Any]] = {}
+
+    async def flush(entries_done: int):
+        batch = await bulk_upsert(PROFILES_TABLE, list(pending.values()), chunk_size=chunk_size)
+        result["written"] += batch["written"]
+        result["failed"].extend(batch["failed"])
+        result["round_trips"] += batch["round_trips"]
+        pending.clear()
+        checkpoint["entries_done"] = entries_done
+        save_checkpoint(checkpoint, checkpoint_file)
+        print(f"Migrated {entries_done} entries ({result['written']} rows written).")
+
+    csv_file = open(csv_path, "w", newline="", encoding="utf-8") if csv_path else None
+    try:
+        writer = csv.DictWriter(csv_file, fieldnames=PROFILE_COLUMNS) if csv_file else None
+        if writer:
+            writer.writeheader()
+        for index, (ay, faculty, student_id, entry) in enumerate(iter_student_entries(path)):
+            result["entries"] += 1
+            row = build_profile_row(entry, updated_at)
+            if not row["full_name"]:
+                continue
+            loaded_names.add(row["full_name"])
+            if writer:
+                writer.writerow(csv_row(row))
+            if index < skip:
+                continue
+            # A name seen twice in one batch would make the upsert touch the same row twice
+            pending[row["full_name"]] = row
+            if len(pending) >= batch_rows:
+                await flush(index + 1)
+        if pending:
+            await flush(result["entries"])
+    finally:
+        if csv_file:
+            csv_file.close()
+
+    result["deleted"] = await reconcile_deletions(loaded_names)
+    if os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+    notify_profiles_changed()
+
+    print(
+        f"Migrated {len(loaded_names)} profiles from {path}: wrote {result['written']} rows in "
+        f"{result['round_trips']} round trips, skipped {skip} already-loaded entries, deleted {result['deleted']} stale profiles."
+    )
+    for failure in result["failed"]:
+        print(f"Failed to insert '{failure['full_name']}': {failure['error']}")
+    if csv_path:
+        print(f"Wrote CSV export to {csv_path}.")
+    return result
+
+async def legacy_main(path: str = INPUT_JSON):
+    with open(path, "r", encoding="utf-8") as f:
         data = json.load(f)
 
+    updated_at = (datetime.now(timezone.utc) - timedelta(days=365)).isoformat()
     rows = []
     for ay, faculties in data.items():
         for faculty, students in faculties.items():
             for student_id, entry in students.items():
-                row = {}
-                row["full_name"] = entry.get("name") or entry.get("full_name")
-                row["bachelor_course"] = entry.get("major", "")
-                row["masters_course"] = entry.get("masters_course", "")
-                row["ddp_or_minor"] = entry.get("ddp_or_minor", "")
-                row["intake_batch"] = extract_ay(entry.get("admit_year"))
-                row["overseas_experience"] = entry.get("overseas_experience", "")
-                row["self_writeup"] = entry.get("self_writeup") or entry.get("writeup", "")
-                row["picture_url"] = entry.get("picture_url", "")
-                
-                # Notable Achievements
-                notable = entry.get("notable_achievements", "")
-                if isinstance(notable, list):
-                    points = [str(x) for x in notable]
-                else:
-                    points = split_bullet_points(notable)
-                points = capitalise_first_word(points)
-                row["notable_achievements"] = json.dumps(points, ensure_ascii=False)
-
-                # Hobbies
-                hobbies = entry.get("interests_hobbies", "")
-                if isinstance(hobbies, list):
-                    points = [str(x) for x in hobbies]
-                else:
-                    points = split_bullet_points(hobbies)
-                points = capitalise_first_word(points)
-                row["hobbies"] = json.dumps(points, ensure_ascii=False)
-
-                row["linkedin_link"] = entry.get("linkedin_link") or entry.get("linkedin_url", "")
-                row["instagram_link"] = entry.get("instagram_link") or entry.get("instagram_url", "")
-                row["github_link"] = entry.get("github_url", "")
-                row["updated_at"] = (datetime.now(timezone.utc) - timedelta(days=365)).isoformat()
-                row["last_modified"] = LAST_MODIFIED_DATE
-
-                filtered_row = {k: row.get(k, "") for k in PROFILE_COLUMNS}
-                rows.append(filtered_row)
+                rows.append(csv_row(build_profile_row(entry, updated_at)))
 
     # Export to CSV
     with open(OUTPUT_CSV, "w", newline="", encoding="utf-8") as f:
         writer = csv.DictWriter(f, fieldnames=PROFILE_COLUMNS)
         writer.writeheader()
         writer.writerows(rows)
-    
+
     # Populate Supabase table
-    clear_profiles_table()
-    insert_profiles_from_csv()
+    await clear_profiles_table()
+    await insert_profiles_from_csv()
+    notify_profiles_changed()
+
+async def main():
+    parser = argparse.ArgumentParser(description="Migrate database.json into the profiles table")
+    parser.add_argument("--input", default=INPUT_JSON)
+    parser.add_argument("--csv", nargs="?", const=OUTPUT_CSV, help=f"also write a CSV export (default path {OUTPUT_CSV})")
+    parser.add_argument("--batch-rows", type=int, default=MIGRATION_BATCH_ROWS)
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint of an interrupted run")
+    parser.add_argument("--legacy", action="store_true", help="write the CSV, wipe the table, then load the CSV")
+    args = parser.parse_args()
+
+    if args.legacy:
+        await legacy_main(args.input)
+    else:
+        await migrate(args.input, args.csv, args.batch_rows, resume=not args.restart)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
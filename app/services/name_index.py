@@ -0,0 +1,117 @@
+import asyncio
+import os
+import time
+from typing import Dict, Optional
+from app.database.db import iter_pages
+
+# Seconds before an index is rebuilt from scratch (this also picks up deleted names)
+NAME_INDEX_TTL_SECONDS = float(os.getenv("NAME_INDEX_TTL_SECONDS", "600"))
+# Seconds before an index fetches rows modified since its last refresh
+NAME_INDEX_REFRESH_SECONDS = float(os.getenv("NAME_INDEX_REFRESH_SECONDS", "30"))
+
+def normalize_name(name) -> str:
+    """Normalise a name the way uploads deduplicate: collapse whitespace, then title-case."""
+    if not isinstance(name, str):
+        return ""
+    return " ".join(name.split()).title()
+
+class NameIndex:
+    """
+    In-process set of the normalised full_name values of a table.
+    Loaded once with keyset pagination, then kept fresh by fetching only rows after the newest
+    (last_modified, full_name) seen, so rows sharing a timestamp (a migration stamps every profile
+    with the same one) are not fetched again. Rebuilt after NAME_INDEX_TTL_SECONDS.
+    """
+
+    def __init__(self, table_name: str, ttl: float = NAME_INDEX_TTL_SECONDS, refresh_interval: float = NAME_INDEX_REFRESH_SECONDS):
+        self.table_name = table_name
+        self.ttl = ttl
+        self.refresh_interval = refresh_interval
+        self.names: Dict[str, str] = {}  # normalised -> name as stored
+        self.loaded_at: Optional[float] = None
+        self.refreshed_at: Optional[float] = None
+        self.last_used: float = time.monotonic()
+        self.watermark: Optional[str] = None  # newest last_modified seen
+        self.watermark_name: Optional[str] = None  # last full_name (in table order) seen with that last_modified
+        self._lock = asyncio.Lock()
+
+    def __contains__(self, name) -> bool:
+        self.last_used = time.monotonic()
+        return normalize_name(name) in self.names
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _add(self, rows):
+        """Adds a page of rows; pages must come in full_name order, as iter_pages reads them."""
+        for row in rows:
+            name = row.get("full_name")
+            if name and name.strip():
+                self.names[normalize_name(name)] = name.strip()
+            modified = row.get("last_modified")
+            if not modified:
+                continue
+            if self.watermark is None or str(modified) > self.watermark:
+                self.watermark, self.watermark_name = str(modified), name
+            elif str(modified) == self.watermark:
+                # Later in table order, so the tiebreak follows the database's collation
+                self.watermark_name = name
+
+    async def refresh(self, force: bool = False) -> "NameIndex":
+        """Brings the index up to date: full reload when stale or forced, otherwise an incremental fetch."""
+        async with self._lock:
+            now = time.monotonic()
+            self.last_used = now
+            if force or self.loaded_at is None or now - self.loaded_at >= self.ttl:
+                self.names = {}
+                self.watermark = self.watermark_name = None
+                async for page in iter_pages(self.table_name, "full_name,last_modified"):
+                    self._add(page)
+                self.loaded_at = self.refreshed_at = now
+            elif now - self.refreshed_at >= self.refresh_interval:
+                await self._fetch_newer()
+                self.refreshed_at = now
+        return self
+
+    async def _fetch_newer(self):
+        """
+        Adds rows after (watermark, watermark_name): those with the same last_modified and a later
+        full_name, then those with a later last_modified. Two keyset reads, since the local backend
+        has no or() filter.
+        """
+        watermark, watermark_name = self.watermark, self.watermark_name
+        if watermark is None:
+            async for page in iter_pages(self.table_name, "full_name,last_modified"):
+                self._add(page)
+            return
+        if watermark_name is not None:
+            same_time = lambda q: q.eq("last_modified", watermark).gt("full_name", watermark_name)
+            async for page in iter_pages(self.table_name, "full_name,last_modified", query_filter=same_time):
+                self._add(page)
+        async for page in iter_pages(
+            self.table_name, "full_name,last_modified", query_filter=lambda q: q.gt("last_modified", watermark)
+        ):
+            self._add(page)
+
+_indexes: Dict[str, NameIndex] = {}
+
+def _evict_idle():
+    """Forget indexes that haven't been used for longer than their TTL."""
+    now = time.monotonic()
+    for table_name in [t for t, index in _indexes.items() if now - index.last_used > index.ttl]:
+        del _indexes[table_name]
+
+async def get_name_index(table_name: str) -> NameIndex:
+    """Returns the shared, up-to-date name index for a table."""
+    _evict_idle()
+    index = _indexes.get(table_name)
+    if index is None:
+        index = _indexes[table_name] = NameIndex(table_name)
+    return await index.refresh()
+
+def invalidate_name_index(table_name: str = None):
+    """Drops the cached index for a table (or all tables) so the next lookup reloads it."""
+    if table_name is None:
+        _indexes.clear()
+    else:
+        _indexes.pop(table_name, None)
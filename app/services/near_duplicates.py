@@ -0,0 +1,188 @@
+# Finds names that probably belong to the same person without being identical,
+# e.g. "Tan Wei Ming" / "Tan Weiming", "Wei Ming Tan" / "Tan Wei Ming",
+# "David Tan Wei Ming" / "Tan Wei Ming" or "Siti Rahman" / "Siti Rahmen".
+# Comparing every pair is quadratic, so names are grouped into blocks by a few keys derived
+# from their tokens and only names sharing a block are compared.
+# Run python -m app.services.near_duplicates "<name>" [...] to match names against profiles.
+
+import os
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from app.services.name_index import normalize_name
+
+# Names in a block before it is skipped: such a key (a very common pair of names) says too little
+NEAR_DUPLICATE_MAX_BLOCK = int(os.getenv("NEAR_DUPLICATE_MAX_BLOCK", "200"))
+# Similarity two differing tokens need to count as a misspelling of each other
+NEAR_DUPLICATE_TYPO_RATIO = float(os.getenv("NEAR_DUPLICATE_TYPO_RATIO", "0.8"))
+# Tokens shorter than this are never treated as misspellings ("Hao" and "Yao" are different names)
+MIN_TYPO_TOKEN_CHARS = 4
+# Shortest drop-one key, so a lone surname never becomes a block
+MIN_KEY_CHARS = 4
+# Tokens beyond which no drop-one keys are made
+MAX_DROP_ONE_TOKENS = 6
+
+NON_ALNUM_RE = re.compile(r"[^0-9a-z]+")
+
+class NameKey(NamedTuple):
+    name: str                   # as given
+    tokens: Tuple[str, ...]     # sorted
+    compact: str                # tokens joined without spaces, in their original order
+
+def name_tokens(name: str) -> List[str]:
+    """Lowercase ASCII tokens of a name: accents dropped, punctuation and hyphens split words."""
+    if not name.isascii():
+        decomposed = unicodedata.normalize("NFKD", name)
+        name = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return NON_ALNUM_RE.sub(" ", name.lower()).split()
+
+def name_key(name: str) -> NameKey:
+    tokens = name_tokens(name)
+    return NameKey(name, tuple(sorted(tokens)), "".join(tokens))
+
+def _difference(a: Tuple[str, ...], b: Tuple[str, ...]) -> Tuple[List[str], List[str]]:
+    """Tokens only in a and only in b (as multisets), merging the two sorted tuples."""
+    only_a, only_b = [], []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        if a[i] == b[j]:
+            i += 1
+            j += 1
+        elif a[i] < b[j]:
+            only_a.append(a[i])
+            i += 1
+        else:
+            only_b.append(b[j])
+            j += 1
+    only_a.extend(a[i:])
+    only_b.extend(b[j:])
+    return only_a, only_b
+
+def blocking_keys(key: NameKey) -> set:
+    """
+    Keys of the blocks a name goes into:
+    the compact name (catches spacing and punctuation), the sorted tokens (word order),
+    and the sorted tokens with any one left out (an extra name, or one misspelt token).
+    """
+    tokens = key.tokens
+    if not tokens:
+        return set()
+    keys = {"c:" + key.compact, "t:" + " ".join(tokens)}
+    if 2 <= len(tokens) <= MAX_DROP_ONE_TOKENS:
+        for i in range(len(tokens)):
+            rest = tokens[:i] + tokens[i + 1:]
+            if sum(map(len, rest)) >= MIN_KEY_CHARS:
+                keys.add("t:" + " ".join(rest))
+    return keys
+
+def score_names(a: NameKey, b: NameKey) -> Optional[Tuple[float, str]]:
+    """
+    (score, reason) if a and b look like the same person, else None. Reasons, most certain first:
+    same letters (only spacing, punctuation or accents differ), word order (same words),
+    extra name (one name's words all appear in the other's), and spelling (all words shared
+    but one, which differs by a typo).
+    """
+    if not a.tokens or not b.tokens:
+        return None
+    if a.compact == b.compact:
+        return 1.0, "same letters"
+    if a.tokens == b.tokens:
+        return 0.95, "word order"
+    only_a, only_b = _difference(a.tokens, b.tokens)
+    if min(len(a.tokens), len(b.tokens)) >= 2 and (not only_a or not only_b):
+        return 0.9, "extra name"
+    if len(only_a) == len(only_b) == 1:
+        x, y = only_a[0], only_b[0]
+        if min(len(x), len(y)) >= MIN_TYPO_TOKEN_CHARS:
+            ratio = SequenceMatcher(None, x, y).ratio()
+            if ratio >= NEAR_DUPLICATE_TYPO_RATIO:
+                return round(0.8 * ratio, 3), "spelling"
+    return None
+
+class NearDuplicateIndex:
+    """Names grouped into blocks (see blocking_keys), to look up the near duplicates of a name."""
+
+    def __init__(self, names: Iterable[str] = (), max_block: int = NEAR_DUPLICATE_MAX_BLOCK):
+        self.max_block = max_block
+        self.comparisons = 0
+        self._keys: Dict[str, NameKey] = {}                 # normalised name -> its key
+        self._blocks: Dict[str, List[str]] = defaultdict(list)  # blocking key -> normalised names
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, name: str):
+        normalized = normalize_name(name)
+        if not normalized or normalized in self._keys:
+            return
+        key = self._keys[normalized] = name_key(name.strip())
+        for block in blocking_keys(key):
+            self._blocks[block].append(normalized)
+
+    def matches(self, name: str, limit: int = 3) -> List[Tuple[str, float, str]]:
+        """
+        Up to limit (name, score, reason) of indexed names that are near duplicates of name,
+        best first. The name itself (after normalize_name) is never a match.
+        """
+        normalized = normalize_name(name)
+        key = self._keys.get(normalized) or name_key(name)
+        seen = {normalized}
+        found = []
+        for block in blocking_keys(key):
+            candidates = self._blocks.get(block, ())
+            if len(candidates) > self.max_block:
+                continue
+            for other in candidates:
+                if other in seen:
+                    continue
+                seen.add(other)
+                self.comparisons += 1
+                other_key = self._keys[other]
+                scored = score_names(key, other_key)
+                if scored:
+                    found.append((other_key.name, *scored))
+        found.sort(key=lambda match: (-match[1], match[0]))
+        return found[:limit]
+
+class SharedIndex:
+    """
+    A NearDuplicateIndex of a table's names kept between uploads, so tens of thousands of
+    profiles are not re-indexed every time. source identifies one load of the names (a NameIndex
+    reload); while it stays the same, names only grow and just the new ones are added.
+    Use it while holding lock: uploads may run on several threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.source: Any = None
+        self.size = 0
+        self.index = NearDuplicateIndex()
+
+    def update(self, source: Any, names: List[str]) -> NearDuplicateIndex:
+        if source != self.source or len(names) < self.size:
+            self.index = NearDuplicateIndex()
+            self.source, self.size = source, 0
+        for name in names[self.size:]:
+            self.index.add(name)
+        self.size = len(names)
+        return self.index
+
+profiles_index = SharedIndex()
+
+if __name__ == "__main__":
+    import asyncio
+    import sys
+    from app.services.name_index import get_name_index
+
+    async def main():
+        index = NearDuplicateIndex((await get_name_index("profiles")).names.values())
+        for name in sys.argv[1:]:
+            for other, score, reason in index.matches(name) or [("-", 0, "no near duplicates")]:
+                print(f"{name}  ->  {other}  {score:.2f} ({reason})")
+
+    asyncio.run(main())
@@ -0,0 +1,192 @@
+# Normalises and checks the picture_url of staged profiles.
+# Google Form uploads are Drive share links, which don't render in an <img>; they are
+# rewritten to direct links, then every distinct URL is fetched (headers only) with a
+# bounded number of requests in flight overall and per host. Results are cached by URL.
+# Run python -m app.services.picture_links <url> [<url> ...] to check URLs by hand.
+
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple, TYPE_CHECKING
+from urllib.parse import parse_qs, urlsplit
+
+# httpx is only needed once URLs are actually checked
+if TYPE_CHECKING:
+    import httpx
+
+# "off" leaves picture_url alone, "normalize" only rewrites links, "check" also fetches them
+PICTURE_CHECK_MODE = os.getenv("PICTURE_CHECK_MODE", "off")
+# Requests in flight at once, overall and per host
+PICTURE_CHECK_CONCURRENCY = int(os.getenv("PICTURE_CHECK_CONCURRENCY", "16"))
+PICTURE_CHECK_PER_HOST = int(os.getenv("PICTURE_CHECK_PER_HOST", "4"))
+PICTURE_CHECK_TIMEOUT_SECONDS = float(os.getenv("PICTURE_CHECK_TIMEOUT_SECONDS", "10"))
+# Seconds a result is reused; failures are retried sooner since they are often transient
+PICTURE_CHECK_TTL_SECONDS = float(os.getenv("PICTURE_CHECK_TTL_SECONDS", "86400"))
+PICTURE_CHECK_FAILURE_TTL_SECONDS = float(os.getenv("PICTURE_CHECK_FAILURE_TTL_SECONDS", "600"))
+MAX_CACHED_PICTURE_CHECKS = int(os.getenv("MAX_CACHED_PICTURE_CHECKS", "20000"))
+
+BROKEN_PICTURE_ISSUE = "Picture URL appears broken"
+
+DRIVE_FILE_PATH_RE = re.compile(r"^/file/d/([\w-]+)")
+# Where a field holding several uploaded files ("https://a, https://b") splits; a comma inside
+# one URL (a query string, a signed CDN path) is not followed by another scheme
+MULTIPLE_URLS_RE = re.compile(r",\s*(?=https?://)", re.IGNORECASE)
+DRIVE_HOSTS = {"drive.google.com", "docs.google.com"}
+
+def normalize_picture_url(url) -> Optional[str]:
+    """
+    Cleans up a picture_url: keeps the first of several uploaded files, adds a missing scheme,
+    and turns Drive share links (open?id=, file/d/<id>/view, uc?id=) into direct image links.
+    """
+    if not isinstance(url, str):
+        return url
+    url = MULTIPLE_URLS_RE.split(url, maxsplit=1)[0].strip()
+    if not url:
+        return None
+    if "://" not in url:
+        url = "https://" + url.lstrip("/")
+    try:
+        parts = urlsplit(url)
+        hostname = parts.hostname
+    except ValueError:
+        # Unparseable (e.g. an unclosed "[" host); left as is for url_problem to report
+        return url
+    if hostname in DRIVE_HOSTS:
+        match = DRIVE_FILE_PATH_RE.match(parts.path)
+        file_id = match.group(1) if match else parse_qs(parts.query).get("id", [None])[0]
+        if file_id:
+            return f"https://drive.google.com/uc?export=view&id={file_id}"
+    return url
+
+def url_problem(url: str) -> Optional[str]:
+    """Why url can't be fetched as a picture at all (unparseable, not http(s), no host), or None."""
+    if not isinstance(url, str):
+        return "invalid URL"
+    try:
+        parts = urlsplit(url)
+        hostname = parts.hostname
+    except ValueError:
+        return "invalid URL"
+    if parts.scheme not in ("http", "https") or not hostname:
+        return "invalid URL"
+    if any(ord(c) < 32 or c.isspace() for c in url):
+        return "invalid URL (contains whitespace or control characters)"
+    return None
+
+class PictureChecker:
+    """
+    Checks that URLs serve an image. Each URL gets a HEAD request (or a one-byte GET where
+    HEAD isn't allowed), following redirects; anything but a 2xx image response is broken.
+    Drive files that aren't shared publicly redirect to a sign-in page, which shows up as HTML.
+    Results are cached per URL with a TTL, shared by every upload in the process.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = PICTURE_CHECK_CONCURRENCY,
+        per_host: int = PICTURE_CHECK_PER_HOST,
+        timeout: float = PICTURE_CHECK_TIMEOUT_SECONDS,
+        ttl: float = PICTURE_CHECK_TTL_SECONDS,
+        failure_ttl: float = PICTURE_CHECK_FAILURE_TTL_SECONDS,
+        max_cached: int = MAX_CACHED_PICTURE_CHECKS,
+        transport: "httpx.AsyncBaseTransport" = None,
+    ):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.max_cached = max_cached
+        self.transport = transport
+        self.requests = 0
+        self.cache_hits = 0
+        self._results: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+
+    def cached(self, url: str) -> Tuple[bool, Optional[str]]:
+        """(found, problem) for url from the cache; problem is None for a working URL."""
+        entry = self._results.get(url)
+        if entry is None:
+            return False, None
+        problem, checked_at = entry
+        if time.monotonic() - checked_at > (self.failure_ttl if problem else self.ttl):
+            del self._results[url]
+            return False, None
+        self._results.move_to_end(url)
+        return True, problem
+
+    def _remember(self, url: str, problem: Optional[str]):
+        self._results[url] = (problem, time.monotonic())
+        self._results.move_to_end(url)
+        while len(self._results) > self.max_cached:
+            self._results.popitem(last=False)
+
+    async def _fetch(self, client: "httpx.AsyncClient", url: str) -> Optional[str]:
+        import httpx
+        self.requests += 1
+        try:
+            response = await client.head(url)
+            if response.status_code in (403, 405, 501):
+                # Some hosts refuse HEAD; ask for a single byte instead
+                async with client.stream("GET", url, headers={"Range": "bytes=0-0"}) as response:
+                    pass
+        except (httpx.HTTPError, httpx.InvalidURL, ValueError) as e:
+            # InvalidURL is not an HTTPError; either way only this URL is broken
+            return f"request failed ({type(e).__name__})"
+        if not response.is_success:
+            return f"HTTP {response.status_code}"
+        content_type = response.headers.get("content-type", "")
+        if not content_type.startswith("image/"):
+            return f"not an image ({content_type.split(';')[0] or 'no content type'})"
+        return None
+
+    async def check(self, urls: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Checks every distinct URL (cached ones are not fetched again). Returns {url: problem or None}."""
+        results, pending = {}, []
+        for url in dict.fromkeys(urls):
+            found, problem = self.cached(url)
+            invalid = None if found else url_problem(url)
+            if invalid:
+                results[url] = invalid
+            elif found:
+                self.cache_hits += 1
+                results[url] = problem
+            else:
+                pending.append(url)
+        if not pending:
+            return results
+
+        import httpx
+        overall = asyncio.Semaphore(max(1, self.concurrency))
+        hosts: Dict[str, asyncio.Semaphore] = {}
+
+        async def check_one(client: "httpx.AsyncClient", url: str):
+            host = urlsplit(url).hostname or ""
+            host_limit = hosts.setdefault(host, asyncio.Semaphore(max(1, self.per_host)))
+            async with host_limit, overall:
+                problem = await self._fetch(client, url)
+            self._remember(url, problem)
+            results[url] = problem
+
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(
+            follow_redirects=True, timeout=self.timeout, limits=limits, transport=self.transport
+        ) as client:
+            await asyncio.gather(*(check_one(client, url) for url in pending))
+        return results
+
+    def clear(self):
+        self._results.clear()
+
+picture_checker = PictureChecker()
+
+if __name__ == "__main__":
+    import sys
+
+    async def main():
+        urls = [normalize_picture_url(url) for url in sys.argv[1:]]
+        for url, problem in (await picture_checker.check(urls)).items():
+            print(f"{'BROKEN' if problem else 'ok':6} {url}{'  ' + problem if problem else ''}")
+
+    asyncio.run(main())
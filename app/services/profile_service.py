@@ -1,71 +1,102 @@
-import chardet
-import csv
-import io
-import pandas as pd
+import codecs
+import copy
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import Executor
 from datetime import datetime
-from typing import List, Dict, Any
-from app.database.supabase_client import supabase
+from typing import List, Dict, Any, Iterator, TYPE_CHECKING
+from app.database.db import fetch_all
+from app.database.bulk import bulk_upsert, bulk_delete, DEFAULT_CHUNK_SIZE
+from app.services.name_index import get_name_index
+from app.services.header_map import HeaderProjection, resolve_headers
+from app.services import upload_cache
+from app.services.near_duplicates import NearDuplicateIndex, profiles_index as shared_profiles_index
+from app.services.picture_links import (
+    BROKEN_PICTURE_ISSUE, PICTURE_CHECK_MODE, PictureChecker, normalize_picture_url, picture_checker, url_problem,
+)
+from app.services.telemetry import (
+    StageTimer, UPLOAD_DUPLICATES, UPLOAD_FLAGGED, UPLOAD_NEAR_DUPLICATES, UPLOAD_ROUND_TRIPS, UPLOAD_ROWS, log_event,
+)
 import asyncio
 import re
 
-# Comprehensive mapping for column names to snake_case, handling different versions of forms
-COLUMN_NAME_MAP = {
-    # Names/IDs
-    "Name": "full_name",
-    "Full Name (as per NRIC)": "full_name",
-    
-    # # Course/Programme
-    # "B.Eng. Major": "bachelor_course",
-    # "Major": "bachelor_course",
+# pandas, chardet and openpyxl are imported by the functions that parse uploads, so importing
+# this module (and with it the app) stays fast; they load when the first upload is processed
+if TYPE_CHECKING:
+    import pandas as pd
 
-    # Masters (if any)
-    "Major (in full)": "masters_course",
+# Match columns exactly
+# TODO: remove overseas_experience
+PROFILES_COLUMNS = set([
+    "full_name", "bachelor_course", "masters_course", "ddp_or_minor",
+    "intake_batch", "overseas_experience", "self_writeup", "picture_url",
+    "notable_achievements", "hobbies", "linkedin_link",
+    "instagram_link", "github_link", "last_modified"
+])
+# issues and content_hash are extra columns (content_hash: text, see sync_staging)
+STAGING_COLUMNS = PROFILES_COLUMNS | {"issues", "content_hash"}
+# Columns left out of the content hash: last_modified changes on every upload
+UNHASHED_COLUMNS = {"last_modified", "content_hash"}
 
-    # DDP/Minor
-    "Special Programmes (DDP outside of CDE, Second Majors, Minors)": "ddp_or_minor",
-    "Specialisation in ...": "ddp_or_minor",  # for variants
-    "Second Major in ...": "ddp_or_minor",
-    "Minor in ...": "ddp_or_minor",
+# "incremental" writes only new/changed rows and deletes vanished ones,
+# "replace" wipes staging and rewrites every row
+STAGING_SYNC_MODE = os.getenv("STAGING_SYNC_MODE", "incremental")
 
-    # Intake batch
-    "Year of Admission": "intake_batch",
+# Bump when cleaning or issue detection changes what a file stages, so cached
+# parse results of earlier uploads (upload_cache.py) are not reused
+CLEANING_RULES_VERSION = "1"
 
-    # Overseas Experience
-    "(If applicable) Where did you go (or will be going) for SEP/summer/winter (school), NOC (location and company), internships (company)": "overseas_experience",
+# Precompiled patterns, shared with the column-wise engine in cleaning.py
+BULLET_PREFIX_RE = re.compile(r'^[-•●·∙⚫⬤○◯☉*-;,.]\s*')
+FACULTY_PREFIX_RE = re.compile(r'^[A-Z\s]+-\s*')
+INTAKE_BATCH_RE = re.compile(r'AY\d{2}/\d{2}')
+LEADING_JUNK_RE = re.compile(r'^[\d\.\-\s]+')
+SOCIAL_LINK_RULES = [
+    ("instagram_link", re.compile(r"^https?://(www\.)?instagram\.com/.+"), "https://instagram.com/"),
+    ("linkedin_link", re.compile(r"^https?://(www\.)?linkedin\.com/in/.+"), "https://linkedin.com/in/"),
+    ("github_link", re.compile(r"^https?://(www\.)?github\.com/.+"), "https://github.com/"),
+]
 
-    # Write-up
-    "Please provide a short write-up of yourself.": "self_writeup",
-    "Self write-up (e.g. Yuxuan's self write-up below). It'll be publicly available so you can also use it as a personal showcase page! (Limit: 200 words)": "self_writeup",
+# "frame" cleans each chunk column-wise (cleaning.py), "row" runs the per-row functions below
+CLEANING_ENGINE = os.getenv("CLEANING_ENGINE", "frame")
 
-    # Photo
-    "Upload a picture of yourself.": "picture_url",
-    "Upload a picture of yourself! Example on the right": "picture_url",
+# "on" flags rows whose name nearly matches another profile or another row of the upload (near_duplicates.py)
+NEAR_DUPLICATE_CHECK = os.getenv("NEAR_DUPLICATE_CHECK", "on")
+NEAR_DUPLICATE_ISSUE = "Possible duplicate of"
 
-    # Achievements
-    "Notable Achievements (max 3)": "notable_achievements",
-    "Notable Achievements (if any, up to 3!) Example on the right": "notable_achievements",
+# Rows parsed per DataFrame chunk when streaming an uploaded file
+READ_CHUNK_ROWS = int(os.getenv("UPLOAD_READ_CHUNK_ROWS", "1000"))
+# Held while staging is compared and written: two uploads diffing against staging at once
+# would leave the union of both files behind
+staging_write_lock = asyncio.Lock()
 
-    # Hobbies
-    "Any interests/ hobbies (max 3)": "hobbies",
-    "Any interests/hobbies? (Up to 3!) Example on the right": "hobbies",
+# Bytes sampled from the start of a CSV to detect its encoding (redetect_encoding reads further if needed)
+ENCODING_SAMPLE_BYTES = 64 * 1024
 
-    # Socials
-    "Linkedin Profile URL": "linkedin_link",
-    "LinkedIn Link (if any)": "linkedin_link",
-    "Instagram Profile URL": "instagram_link",
-    "Instagram Link (if any)": "instagram_link",
-    "Github Profile URL": "github_link",
-}
+def build_staging_row(fixed_row: Dict[str, Any], issues: List[str], size_report: Dict[str, int] = None) -> Dict[str, Any]:
+    """
+    Project a fixed row onto STAGING_COLUMNS.
+    Every row carries the same keys so rows can be upserted together in one request.
+    size_report, if given, has the bytes of the row's encoded content added to its "contentBytes".
+    """
+    staging_row = {k: fixed_row.get(k) for k in STAGING_COLUMNS}
+    staging_row["issues"] = issues if issues else None
+    encoded = encode_row_content(staging_row)
+    staging_row["content_hash"] = hashlib.sha256(encoded).hexdigest()
+    if size_report is not None:
+        size_report["contentBytes"] = size_report.get("contentBytes", 0) + len(encoded)
+    return staging_row
 
-# Match columns exactly
-# TODO: remove overseas_experience
-PROFILES_COLUMNS = set([
-    "full_name", "bachelor_course", "masters_course", "ddp_or_minor",
-    "intake_batch", "overseas_experience", "self_writeup", "picture_url",
-    "notable_achievements", "hobbies", "linkedin_link",
-    "instagram_link", "github_link", "last_modified"
-])
-STAGING_COLUMNS = PROFILES_COLUMNS | {"issues"} # issues is an extra column
+def encode_row_content(staging_row: Dict[str, Any]) -> bytes:
+    """A staging row's content (all but UNHASHED_COLUMNS) as canonical UTF-8 JSON."""
+    content = {k: v for k, v in staging_row.items() if k not in UNHASHED_COLUMNS}
+    return json.dumps(content, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+
+def row_content_hash(staging_row: Dict[str, Any]) -> str:
+    """Stable hash of a staging row's content, used to skip rewriting unchanged rows."""
+    return hashlib.sha256(encode_row_content(staging_row)).hexdigest()
 
 def split_bullet_points(text: str) -> List[str]:
     """Split text into bullet points, handling various bullet point styles and standardize to * format."""
@@ -87,12 +118,21 @@ def split_bullet_points(text: str) -> List[str]:
     cleaned_points = []
     for line in lines:
         # Remove any existing bullet point markers
-        line = re.sub(r'^[-•●·∙⚫⬤○◯☉*-;,.]\s*', '', line.strip())
+        line = BULLET_PREFIX_RE.sub('', line.strip())
         if line:
             cleaned_points.append(f"{line}")
     
     return cleaned_points
 
+def to_bullet_points(value) -> List[str]:
+    """Bullet points from free text, or from a list that is already split (as stored in staging or sent by reviewers)."""
+    if isinstance(value, list):
+        return [str(point).strip() for point in value if point is not None and str(point).strip()]
+    if value and not isinstance(value, str):
+        # A number typed into the form, read as one from XLSX cells
+        value = str(value)
+    return split_bullet_points(value)
+
 def clean_bachelor_course(course: str) -> str:
     """
     Removes faculty prefix (e.g., 'MPE - ') and trailing semicolons from the bachelor_course field.
@@ -100,7 +140,7 @@ def clean_bachelor_course(course: str) -> str:
     if not isinstance(course, str):
         return course
     # Remove leading 'XXX - ' (any uppercase letters/spaces) and trailing semicolons/spaces
-    course = re.sub(r'^[A-Z\s]+-\s*', '', course)
+    course = FACULTY_PREFIX_RE.sub('', course)
     course = course.strip().rstrip(';')
     if course == "Multidisciplinary Programme (Computer Engineering)":
         course = "Computer Engineering"
@@ -109,38 +149,38 @@ def clean_bachelor_course(course: str) -> str:
 def is_non_empty(val):
     return isinstance(val, str) and val.strip() != ""
 
-def translate_row_keys(row: Dict[str, Any]) -> Dict[str, Any]:
-    """Translate the keys of a row using COLUMN_NAME_MAP."""
-    translated = {COLUMN_NAME_MAP.get(k, k): v for k, v in row.items()}
-
-    bachelor_course = None
-    if is_non_empty(row.get("B.Eng. Major", "")):
-        bachelor_course = row["B.Eng. Major"]
-    elif is_non_empty(row.get("Major", "")):
-        bachelor_course = row["Major"]
-    if bachelor_course is not None:
-        translated["bachelor_course"] = bachelor_course
+def translate_row_keys(row: Dict[str, Any], projection: HeaderProjection = None) -> Dict[str, Any]:
+    """
+    Translate the keys of a row using the header projection for its keys
+    (resolved from COLUMN_NAME_MAP and COLUMN_PRECEDENCE, cached per header row).
+    """
+    if projection is None:
+        projection = resolve_headers(list(row))
+    translated = projection.project(list(row.values()))
     
     # Process intake_batch
     if "intake_batch" in translated:
         batch = translated["intake_batch"]
-        if batch:
+        if isinstance(batch, str) and batch:
             # Extract AY##/## pattern
-            match = re.search(r'AY\d{2}/\d{2}', batch)
+            match = INTAKE_BATCH_RE.search(batch)
             if match:
                 translated["intake_batch"] = match.group(0)
 
     return translated
 
 def detect_and_fix_issues(profile_data: Dict[str, Any]) -> tuple[List[str], Dict[str, Any]]:
-    """Detect issues and fix them in one pass, returning both issues and fixed data."""
+    """
+    Detect issues and fix them in one pass, returning both issues and fixed data.
+    Achievements and hobbies may be free text or lists of points, so staged rows can be checked again.
+    """
     issues = []
     fixed_data = profile_data.copy()
 
     # Notable Achievements
     achievements = fixed_data.get("notable_achievements", "")
     if achievements:
-        points = split_bullet_points(achievements)
+        points = to_bullet_points(achievements)
         points = capitalise_first_word(points)  
         if not points:
             issues.append("Notable achievements format is invalid")
@@ -149,21 +189,17 @@ def detect_and_fix_issues(profile_data: Dict[str, Any]) -> tuple[List[str], Dict
     # Hobbies
     hobbies = fixed_data.get("hobbies", "")
     if hobbies:
-        points = split_bullet_points(hobbies)
+        points = to_bullet_points(hobbies)
         points = capitalise_first_word(points) 
         if not points:
             issues.append("Hobbies format is invalid")
         fixed_data["hobbies"] = points
 
     # Social links: validate and fix
-    for key, pattern, prefix in [
-        ("instagram_link", r"^https?://(www\.)?instagram\.com/.+", "https://instagram.com/"),
-        ("linkedin_link", r"^https?://(www\.)?linkedin\.com/in/.+", "https://linkedin.com/in/"),
-        ("github_link", r"^https?://(www\.)?github\.com/.+", "https://github.com/"),
-    ]:
+    for key, pattern, prefix in SOCIAL_LINK_RULES:
         val = fixed_data.get(key, "")
         if val:
-            if not re.match(pattern, val):
+            if not pattern.match(val):
                 issues.append(f"{key.replace('_', ' ').title()} appears invalid")
                 # Fix the link
                 if "/" not in val:
@@ -180,7 +216,7 @@ def clean_text(text):
     if not isinstance(text, str):
         return text
     lines = text.splitlines()
-    cleaned_lines = [re.sub(r'^[\d\.\-\s]+', '', line.strip()) for line in lines]
+    cleaned_lines = [LEADING_JUNK_RE.sub('', line.strip()) for line in lines]
     cleaned_text = '\n'.join(cleaned_lines).strip()
     return cleaned_text if cleaned_text else None
 
@@ -194,6 +230,7 @@ def capitalise_first_word(points: list[str]) -> list[str]:
     return [cap_first(point) for point in points]
 
 def clean_row_fields(row: Dict[str, Any]) -> Dict[str, Any]:
+    import pandas as pd
     for k, v in row.items():
         if isinstance(v, str):
             row[k] = clean_text(v)
@@ -205,79 +242,490 @@ def clean_row_fields(row: Dict[str, Any]) -> Dict[str, Any]:
             row[k] = None
     return row
 
-def read_profiles_file(file_bytes: bytes, filename: str) -> list[dict]:
+def detect_encoding(file_path: str) -> str:
+    """
+    Detects the encoding of a file from a sample of its first bytes.
+    UTF-8 (the Google Forms export default) is checked first, chardet is only used as a fallback.
+    """
+    with open(file_path, "rb") as f:
+        sample = f.read(ENCODING_SAMPLE_BYTES)
+    try:
+        # Incremental decode so a multi-byte character cut off at the end of the sample is not an error
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        pass
+    import chardet
+    detection = chardet.detect(sample)
+    return detection.get("encoding") or "utf-8-sig"
+
+def _decodes(file_path: str, encoding: str) -> bool:
+    """Whether the whole file decodes with encoding, read in ENCODING_SAMPLE_BYTES blocks."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(ENCODING_SAMPLE_BYTES), b""):
+                decoder.decode(block)
+        decoder.decode(b"", final=True)
+        return True
+    except (UnicodeDecodeError, LookupError):
+        return False
+
+def redetect_encoding(file_path: str) -> str:
     """
-    Reads a CSV or XLSX file and returns list of dicts.
-    Detects file type by extension.
+    Encoding of a file that failed to decode past the sample detect_encoding looked at
+    (e.g. a cp1252 "Renée" near the end of an otherwise ASCII file). chardet is given the lines
+    that have non-ASCII bytes, and its answer must decode the whole file; otherwise cp1252,
+    then latin-1, which decodes any bytes.
     """
+    sample = bytearray()
+    with open(file_path, "rb") as f:
+        for line in f:
+            if not line.isascii():
+                sample += line
+                if len(sample) >= ENCODING_SAMPLE_BYTES:
+                    break
+    import chardet
+    detected = chardet.detect(bytes(sample)).get("encoding")
+    for encoding in (detected, "cp1252"):
+        if encoding and _decodes(file_path, encoding):
+            return encoding
+    return "latin-1"
+
+def _xlsx_header(cells) -> List[str]:
+    """Name header cells the way pandas does: blanks become 'Unnamed: i', repeats get a '.n' suffix."""
+    header = []
+    seen = {}
+    for i, cell in enumerate(cells):
+        name = f"Unnamed: {i}" if cell is None else str(cell)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        header.append(name)
+    return header
+
+def iter_profile_frames(file_path: str, filename: str, chunk_rows: int = READ_CHUNK_ROWS, timer: StageTimer = None) -> Iterator["pd.DataFrame"]:
+    """
+    Reads a CSV or XLSX file from disk and yields DataFrames of at most chunk_rows rows.
+    Detects file type by extension. Only one chunk is held in memory at a time.
+    timer, if given, times encoding detection as its own stage.
+    """
+    import pandas as pd
+    if timer is None:
+        timer = StageTimer()
     ext = filename.lower().split('.')[-1]
     if ext == 'csv':
-        # Try to detect encoding, fallback to utf-8-sig
+        with timer.span("detect_encoding"):
+            encoding = detect_encoding(file_path)
+        rows_read = 0
         try:
-            detection = chardet.detect(file_bytes)
-            encoding = detection.get("encoding") or "utf-8-sig"
-            text = file_bytes.decode(encoding)
-        except Exception:
-            text = file_bytes.decode('utf-8-sig')
-        df = pd.read_csv(io.StringIO(text))
+            for frame in pd.read_csv(file_path, encoding=encoding, chunksize=chunk_rows):
+                yield frame
+                rows_read += len(frame)
+        except UnicodeDecodeError:
+            with timer.span("detect_encoding"):
+                retry = redetect_encoding(file_path)
+            log_event("encoding_redetected", logging.WARNING, file=filename, detected=encoding, encoding=retry, rowsRead=rows_read)
+            # Rows before the bad byte were already yielded; parse them again but skip them
+            for frame in pd.read_csv(file_path, encoding=retry, chunksize=chunk_rows):
+                if rows_read >= len(frame):
+                    rows_read -= len(frame)
+                    continue
+                yield frame.iloc[rows_read:]
+                rows_read = 0
     elif ext == 'xlsx':
-        df = pd.read_excel(io.BytesIO(file_bytes), engine='openpyxl')
+        import openpyxl
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = _xlsx_header(next(rows, ()))
+            buffer = []
+            for values in rows:
+                if all(v is None for v in values):
+                    continue
+                buffer.append(values[:len(header)])
+                if len(buffer) >= chunk_rows:
+                    yield pd.DataFrame(buffer, columns=header)
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer, columns=header)
+        finally:
+            workbook.close()
     else:
         raise ValueError("Unsupported file type!")
-    # Convert DataFrame to list of dicts
-    return df.to_dict(orient='records')
-
-async def process_profiles_file(file_bytes: bytes, filename: str, upload_id: str):
-    # Clear the staging table first
-    names = [
-        row["full_name"]
-        for row in supabase.table("staging").select("full_name").execute().data
-    ]
-    if names:
-        supabase.table("staging").delete().in_("full_name", names).execute()
-    
-    rows = read_profiles_file(file_bytes, filename)
-    
+
+def new_progress() -> Dict[str, int]:
+    """Progress counters updated while an upload is processed."""
+    return {
+        "rowsRead": 0, "deduped": 0, "duplicates": 0, "staged": 0, "unchanged": 0,
+        "deleted": 0, "failed": 0, "flagged": 0, "existing": 0, "brokenPictures": 0, "nearDuplicates": 0,
+    }
+
+def check_headers(projection: HeaderProjection, header_report: Dict[str, Any] = None):
+    """
+    Reports unknown and ambiguous headers before any row is processed,
+    and rejects files without a name column since nothing could be staged.
+    """
+    report = projection.report()
+    if header_report is not None:
+        header_report.update(report)
+    if report["unknownHeaders"]:
+        log_event("unknown_headers_ignored", logging.WARNING, headers=report["unknownHeaders"])
+    for target, headers in report["ambiguousHeaders"].items():
+        # The last non-empty one wins
+        log_event("ambiguous_headers", logging.WARNING, target=target, headers=headers)
+    if "full_name" not in projection.sources:
+        raise ValueError("No name column found in the uploaded file")
+
+def iter_cleaned_rows(
+    file_path: str, filename: str, engine: str = CLEANING_ENGINE, header_report: Dict[str, Any] = None, timer: StageTimer = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the translated and cleaned rows of an uploaded file using the given cleaning engine.
+    timer, if given, gets the time spent reading chunks ("parse") and cleaning them ("clean").
+    Each chunk is cleaned whole so no span is open while the caller consumes rows.
+    """
+    if engine not in ("frame", "row"):
+        raise ValueError(f"Unknown cleaning engine: {engine}")
+    if timer is None:
+        timer = StageTimer()
+    # pandas and numpy load here on the first upload (see the note on imports above)
+    with timer.span("load_libraries"):
+        from app.services.cleaning import iter_clean_records
+    checked = False
+    frames = iter_profile_frames(file_path, filename, timer=timer)
+    try:
+        while True:
+            with timer.span("parse"):
+                frame = next(frames, None)
+            if frame is None:
+                return
+            with timer.span("clean"):
+                projection = resolve_headers(frame.columns)
+                if not checked:
+                    check_headers(projection, header_report)
+                    checked = True
+                if engine == "frame":
+                    rows = list(iter_clean_records(frame, projection))
+                else:
+                    rows = [clean_row_fields(translate_row_keys(row, projection)) for row in frame.to_dict(orient='records')]
+            yield from rows
+    finally:
+        frames.close()
+
+def dedupe_rows(rows, progress: Dict[str, int] = None) -> tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Deduplicates cleaned rows on full_name.title(), keeping the latest row for each name.
+    Returns (deduped rows by name, duplicate_rows).
+    """
+    if progress is None:
+        progress = new_progress()
     deduped = {}
     duplicate_rows = []
-    for i, row in enumerate(rows):
-        mapped_row = translate_row_keys(row)
-        mapped_row = clean_row_fields(mapped_row)
+    for i, mapped_row in enumerate(rows):
+        progress["rowsRead"] += 1
         full_name = mapped_row.get("full_name")
         if not full_name:
             continue
-        key = full_name.title()
+        # A name typed as a number arrives as one from XLSX cells
+        key = str(full_name).title()
         if key in deduped:
+            # Only indexes are kept so memory doesn't grow with the number of duplicates
             duplicate_rows.append({
                 "row_index": i,
                 "duplicate_full_name": key,
-                "duplicate_row_data": row,
                 "kept_row_index": deduped[key].get("row_index", None),
-                "kept_row_data": deduped[key],
             })
+            progress["duplicates"] += 1
         mapped_row["row_index"] = i  # Store for tracking
         deduped[key] = mapped_row    # Always keep the latest
+    progress["deduped"] = len(deduped)
+    return deduped, duplicate_rows
 
+def build_staging_rows(
+    deduped: Dict[str, Dict[str, Any]], now: str, progress: Dict[str, int] = None, size_report: Dict[str, int] = None
+) -> List[Dict[str, Any]]:
+    """Runs issue detection on the deduplicated rows and builds the rows to stage (see build_staging_row for size_report)."""
+    if progress is None:
+        progress = new_progress()
+    staging_rows = []
     for full_name, mapped_row in deduped.items():
         mapped_row["full_name"] = full_name
-        mapped_row["last_modified"] = datetime.utcnow().isoformat()
+        mapped_row["last_modified"] = now
         issues, fixed_row = detect_and_fix_issues(mapped_row)
-        
-        if isinstance(fixed_row.get("notable_achievements"), list):
-            fixed_row["notable_achievements"] = fixed_row["notable_achievements"]
-        if isinstance(fixed_row.get("hobbies"), list):
-            fixed_row["hobbies"] = fixed_row["hobbies"]
-        # Prepare row for staging
         if issues:
-            staging_row = {k: v for k, v in fixed_row.items() if k in PROFILES_COLUMNS}
-            staging_row["issues"] = issues
-        else:
-            staging_row = {k: v for k, v in fixed_row.items() if k in PROFILES_COLUMNS}
-        supabase.table("staging").upsert(staging_row).execute()
-    
-    if duplicate_rows:
-        print(f"{len(duplicate_rows)} duplicate rows dropped (kept the latest for each name):")
-        for entry in duplicate_rows:
-            print(f"Row {entry['row_index']} is a duplicate for full_name '{entry['duplicate_full_name']}' (original kept at row {entry['kept_row_index']})")
+            progress["flagged"] += 1
+        staging_rows.append(build_staging_row(fixed_row, issues, size_report))
+    return staging_rows
+
+def prepare_staging_rows(
+    file_path: str,
+    filename: str,
+    progress: Dict[str, int] = None,
+    engine: str = CLEANING_ENGINE,
+    now: str = None,
+    header_report: Dict[str, Any] = None,
+    timer: StageTimer = None,
+    size_report: Dict[str, int] = None,
+) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Reads, translates, cleans and deduplicates an uploaded file, then runs issue detection.
+    now is the last_modified stamp for every row (defaults to the current UTC time).
+    header_report, if given, receives the unknown and ambiguous headers of the file.
+    timer, if given, gets the time of each stage (see iter_cleaned_rows).
+    size_report, if given, receives "contentBytes": the JSON size of the rows' content, measured
+    as each row is hashed (see upload_cache.parsed_size).
+    Returns (staging_rows, duplicate_rows). CPU-bound, so callers run it off the event loop.
+    """
+    if progress is None:
+        progress = new_progress()
+    if now is None:
+        now = datetime.utcnow().isoformat()
+    if timer is None:
+        timer = StageTimer()
+    # Reading and cleaning happen inside deduplication, but are timed as their own stages
+    with timer.span("dedupe"):
+        deduped, duplicate_rows = dedupe_rows(iter_cleaned_rows(file_path, filename, engine, header_report, timer), progress)
+    with timer.span("issues"):
+        staging_rows = build_staging_rows(deduped, now, progress, size_report)
+    return staging_rows, duplicate_rows
+
+async def sync_staging(staging_rows: List[Dict[str, Any]], mode: str = STAGING_SYNC_MODE, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Makes the staging table hold exactly staging_rows.
+    In incremental mode rows are compared by content_hash with what staging already holds:
+    only new or changed rows are upserted and only names that vanished are deleted.
+    In replace mode staging is wiped and every row is rewritten.
+    Holds staging_write_lock throughout, so uploads parsed side by side write one after the other.
+    Returns the bulk_upsert result plus "unchanged" and "deleted" counts.
+    """
+    async with staging_write_lock:
+        return await _sync_staging(staging_rows, mode, chunk_size)
+
+async def _sync_staging(staging_rows: List[Dict[str, Any]], mode: str, chunk_size: int) -> Dict[str, Any]:
+    if mode == "incremental":
+        existing = {row["full_name"]: row.get("content_hash") for row in await fetch_all("staging", "full_name,content_hash")}
+        incoming = {row["full_name"] for row in staging_rows}
+        to_write = [row for row in staging_rows if existing.get(row["full_name"]) != row["content_hash"]]
+        to_delete = [name for name in existing if name not in incoming]
+    elif mode == "replace":
+        to_write = staging_rows
+        to_delete = [row["full_name"] for row in await fetch_all("staging", "full_name")]
     else:
-        print("No duplicate rows found.")
+        raise ValueError(f"Unknown staging sync mode: {mode}")
+
+    try:
+        # Delete before writing so a replace never removes freshly written rows
+        delete_round_trips = await bulk_delete("staging", "full_name", to_delete)
+        result = await bulk_upsert("staging", to_write, chunk_size)
+    finally:
+        # Also when the write was abandoned part way (BulkWriteAborted): staging may have changed
+        if to_write or to_delete:
+            upload_cache.bump_staging_version()
+    result["round_trips"] += delete_round_trips
+    result["unchanged"] = len(staging_rows) - len(to_write)
+    result["deleted"] = len(to_delete)
+    return result
+
+async def validate_pictures(
+    staging_rows: List[Dict[str, Any]],
+    mode: str = PICTURE_CHECK_MODE,
+    checker: PictureChecker = None,
+    progress: Dict[str, int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Optional picture_url stage (see picture_links.py). "normalize" rewrites picture links,
+    "check" also fetches them. Rows whose picture is broken get BROKEN_PICTURE_ISSUE; in both
+    modes that includes links that can't be fetched at all (unparseable, no host).
+    Returns the rows rebuilt so their content_hash covers the new values.
+    """
+    if mode == "off":
+        return staging_rows
+    if mode not in ("normalize", "check"):
+        raise ValueError(f"Unknown picture check mode: {mode}")
+    for row in staging_rows:
+        row["picture_url"] = normalize_picture_url(row.get("picture_url"))
+
+    # Links that can't be fetched at all are broken in either mode
+    problems = {row["picture_url"]: url_problem(row["picture_url"]) for row in staging_rows if row.get("picture_url")}
+    if mode == "check":
+        checker = checker or picture_checker
+        problems = await checker.check(problems)
+
+    rebuilt = []
+    for row in staging_rows:
+        issues = [issue for issue in row.get("issues") or [] if issue != BROKEN_PICTURE_ISSUE]
+        if problems.get(row.get("picture_url")):
+            issues.append(BROKEN_PICTURE_ISSUE)
+            if progress is not None:
+                progress["brokenPictures"] += 1
+                if not row.get("issues"):
+                    progress["flagged"] += 1
+        rebuilt.append(build_staging_row(row, issues))
+    return rebuilt
+
+def flag_near_duplicates(
+    staging_rows: List[Dict[str, Any]],
+    existing_names: List[str],
+    progress: Dict[str, int] = None,
+    source=None,
+) -> List[Dict[str, Any]]:
+    """
+    Adds an issue to rows whose name nearly matches a name in existing_names (the profiles table)
+    or another row of the same upload, e.g. "Possible duplicate of 'Tan Weiming' in profiles (same letters)".
+    Identical names are not flagged: they update the existing profile. CPU-bound, run it off the event loop.
+    With source (see near_duplicates.SharedIndex) the profiles are indexed once and reused by later uploads.
+    Returns the rows rebuilt so their content_hash covers the new issues.
+    """
+    if source is None:
+        return _flag_near_duplicates(staging_rows, NearDuplicateIndex(existing_names), progress)
+    with shared_profiles_index.lock:
+        return _flag_near_duplicates(staging_rows, shared_profiles_index.update(source, existing_names), progress)
+
+def _flag_near_duplicates(staging_rows: List[Dict[str, Any]], profiles: NearDuplicateIndex, progress: Dict[str, int]) -> List[Dict[str, Any]]:
+    upload = NearDuplicateIndex(row["full_name"] for row in staging_rows)
+    rebuilt = []
+    for row in staging_rows:
+        issues = [issue for issue in row.get("issues") or [] if not issue.startswith(NEAR_DUPLICATE_ISSUE)]
+        found = [(name, "profiles", reason) for name, _, reason in profiles.matches(row["full_name"])]
+        found += [(name, "this upload", reason) for name, _, reason in upload.matches(row["full_name"])]
+        for name, source, reason in found:
+            issues.append(f"{NEAR_DUPLICATE_ISSUE} '{name}' in {source} ({reason})")
+        if found and progress is not None:
+            progress["nearDuplicates"] += 1
+            if not row.get("issues"):
+                progress["flagged"] += 1
+        rebuilt.append(build_staging_row(row, issues))
+    return rebuilt
+
+async def process_profiles_file(
+    file_path: str,
+    filename: str,
+    upload_id: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: Dict[str, int] = None,
+    executor: Executor = None,
+    sync_mode: str = STAGING_SYNC_MODE,
+    header_report: Dict[str, Any] = None,
+    cache_key: str = None,
+    timer: StageTimer = None,
+):
+    """
+    Processes an uploaded file that has been spooled to file_path and stages its profiles.
+    Parsing and cleaning run on executor (the loop's default executor if None).
+    header_report, if given, receives the unknown and ambiguous headers of the file.
+    cache_key, if given, identifies the file content: a parse result cached under it is
+    reused instead of parsing again, and a fresh parse result is cached under it.
+    timer, if given, receives the time of each stage; stage times are also recorded as metrics.
+    The file is removed once processing finishes.
+    """
+    if progress is None:
+        progress = new_progress()
+    if header_report is None:
+        header_report = {}
+    if timer is None:
+        timer = StageTimer()
+    try:
+        write_result = await _stage_profiles_file(
+            file_path, filename, upload_id, chunk_size, progress, executor, sync_mode, header_report, cache_key, timer
+        )
+    finally:
+        timer.observe()
+
+    UPLOAD_ROWS.inc(progress["rowsRead"], outcome="read")
+    UPLOAD_ROWS.inc(write_result["written"], outcome="staged")
+    UPLOAD_ROWS.inc(write_result["unchanged"], outcome="unchanged")
+    UPLOAD_ROWS.inc(write_result["deleted"], outcome="deleted")
+    UPLOAD_ROWS.inc(len(write_result["failed"]), outcome="failed")
+    UPLOAD_DUPLICATES.inc(progress["duplicates"])
+    UPLOAD_FLAGGED.inc(progress["flagged"])
+    UPLOAD_NEAR_DUPLICATES.inc(progress["nearDuplicates"])
+    UPLOAD_ROUND_TRIPS.inc(write_result["round_trips"])
+    return write_result
+
+async def _stage_profiles_file(
+    file_path: str,
+    filename: str,
+    upload_id: str,
+    chunk_size: int,
+    progress: Dict[str, int],
+    executor: Executor,
+    sync_mode: str,
+    header_report: Dict[str, Any],
+    cache_key: str,
+    timer: StageTimer,
+):
+    loop = asyncio.get_running_loop()
+    cached = upload_cache.cache.get_parsed(cache_key) if cache_key else None
+    try:
+        if cached is not None:
+            # The cached rows are shared with later uploads of this content, so work on a copy
+            with timer.span("cache"):
+                cached = await loop.run_in_executor(executor, copy.deepcopy, cached)
+            now = datetime.utcnow().isoformat()
+            staging_rows, duplicate_rows = cached["stagingRows"], cached["duplicateRows"]
+            for row in staging_rows:
+                row["last_modified"] = now
+            progress.update(cached["progress"])
+            header_report.update(cached["headerReport"])
+            log_event("upload_parse_reused", uploadId=upload_id, cacheKey=cache_key)
+        else:
+            size_report = {}
+            staging_rows, duplicate_rows = await loop.run_in_executor(
+                executor, prepare_staging_rows, file_path, filename, progress, CLEANING_ENGINE, None, header_report, timer, size_report
+            )
+            if cache_key:
+                with timer.span("cache"):
+                    size = upload_cache.parsed_size(size_report.get("contentBytes", 0), len(staging_rows), duplicate_rows)
+                    upload_cache.cache.store_parsed(cache_key, staging_rows, duplicate_rows, progress, header_report, size)
+    finally:
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+    with timer.span("pictures"):
+        staging_rows = await validate_pictures(staging_rows, progress=progress)
+
+    # Profiles that are already published, checked against the cached name index
+    with timer.span("existing"):
+        profiles_index = await get_name_index("profiles")
+        progress["existing"] = sum(1 for row in staging_rows if row["full_name"] in profiles_index)
+
+    if NEAR_DUPLICATE_CHECK == "on":
+        with timer.span("near_duplicates"):
+            # A snapshot of the names, since the index may refresh while this runs on another thread
+            existing_names = list(profiles_index.names.values())
+            source = (profiles_index.table_name, profiles_index.loaded_at)
+            staging_rows = await asyncio.get_running_loop().run_in_executor(
+                executor, flag_near_duplicates, staging_rows, existing_names, progress, source
+            )
+
+    # Staging is only touched once the file has parsed
+    with timer.span("write"):
+        write_result = await sync_staging(staging_rows, sync_mode, chunk_size)
+    progress["staged"] = write_result["written"]
+    progress["unchanged"] = write_result["unchanged"]
+    progress["deleted"] = write_result["deleted"]
+    progress["failed"] = len(write_result["failed"])
+    log_event(
+        "upload_staged", uploadId=upload_id, filename=filename, rowsRead=progress["rowsRead"],
+        written=write_result["written"], unchanged=write_result["unchanged"], deleted=write_result["deleted"],
+        failed=progress["failed"],
+        existing=progress["existing"], flagged=progress["flagged"], duplicates=len(duplicate_rows),
+        nearDuplicates=progress["nearDuplicates"],
+        roundTrips=write_result["round_trips"], timings=timer.rounded(),
+    )
+    for failure in write_result["failed"]:
+        log_event("staging_write_failed", logging.ERROR, uploadId=upload_id, fullName=failure["full_name"], error=failure["error"])
+
+    # Duplicates are dropped keeping the latest row for each name
+    for entry in duplicate_rows:
+        log_event(
+            "duplicate_row_dropped", uploadId=upload_id, rowIndex=entry["row_index"],
+            fullName=entry["duplicate_full_name"], keptRowIndex=entry["kept_row_index"],
+        )
+
+    return write_result
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.database.db import fetch_all
+from app.database.bulk import bulk_upsert, DEFAULT_CHUNK_SIZE
+from app.services.name_index import invalidate_name_index, normalize_name
+from app.services.profile_service import PROFILES_COLUMNS
+from app.services.public_profiles import invalidate_public_cache
+from app.services.telemetry import log_event
+
+PROFILES_TABLE = "profiles"
+STAGING_TABLE = "staging"
+# Fields compared between staging and profiles; last_modified is stamped on every write
+DIFF_COLUMNS = sorted(PROFILES_COLUMNS - {"full_name", "last_modified"})
+# Finished promotion jobs kept for status lookups
+MAX_TRACKED_PROMOTIONS = int(os.getenv("PROMOTION_MAX_TRACKED_JOBS", "20"))
+
+class PromotionInProgress(Exception):
+    """Raised when a promotion that writes is already running."""
+
+promotions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_tasks: set = set()
+
+def _comparable(value):
+    """Treats blanks, empty lists and None as the same missing value."""
+    if value is None or value == [] or (isinstance(value, str) and not value.strip()):
+        return None
+    return value
+
+def diff_rows(staged: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Field-level changes from a profiles row to a staging row: {field: {"from", "to"}}."""
+    changes = {}
+    for column in DIFF_COLUMNS:
+        old, new = _comparable(current.get(column)), _comparable(staged.get(column))
+        if old != new:
+            changes[column] = {"from": current.get(column), "to": staged.get(column)}
+    return changes
+
+async def compute_promotion_diff(include_flagged: bool = False) -> Dict[str, Any]:
+    """
+    Compares every staging row with profiles, matching names the way uploads deduplicate.
+    Rows with issues are reported as flagged and left out unless include_flagged.
+    Returns {"inserts": [names], "updates": [{"full_name", "changes"}], "unchanged": int,
+    "flagged": [{"full_name", "issues"}], "rows": [profiles rows to write]}.
+    """
+    staging_rows, profile_rows = await asyncio.gather(
+        fetch_all(STAGING_TABLE, ",".join(sorted(PROFILES_COLUMNS | {"issues"}))),
+        fetch_all(PROFILES_TABLE, ",".join(sorted(PROFILES_COLUMNS))),
+    )
+    profiles_by_name = {normalize_name(row["full_name"]): row for row in profile_rows if row.get("full_name")}
+
+    diff = {"inserts": [], "updates": [], "unchanged": 0, "flagged": [], "rows": []}
+    for staged in staging_rows:
+        if not staged.get("full_name"):
+            continue
+        if staged.get("issues"):
+            diff["flagged"].append({"full_name": staged["full_name"], "issues": staged["issues"]})
+            if not include_flagged:
+                continue
+        current = profiles_by_name.get(normalize_name(staged["full_name"]))
+        row = {k: staged.get(k) for k in PROFILES_COLUMNS}
+        if current is None:
+            diff["inserts"].append(staged["full_name"])
+        else:
+            changes = diff_rows(staged, current)
+            if not changes:
+                diff["unchanged"] += 1
+                continue
+            # Keep the stored spelling so the upsert updates that row instead of adding another
+            row["full_name"] = current["full_name"]
+            diff["updates"].append({"full_name": current["full_name"], "changes": changes})
+        diff["rows"].append(row)
+    return diff
+
+async def apply_promotion(rows: List[Dict[str, Any]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """Upserts the changed rows into profiles in chunks, then drops the caches that serve profiles."""
+    now = datetime.utcnow().isoformat()
+    for row in rows:
+        row["last_modified"] = now
+    result = await bulk_upsert(PROFILES_TABLE, rows, chunk_size=chunk_size)
+    invalidate_public_cache()
+    invalidate_name_index(PROFILES_TABLE)
+    return result
+
+def get_promotion(promotion_id: str) -> Optional[Dict[str, Any]]:
+    return promotions.get(promotion_id)
+
+def _forget_old_promotions():
+    excess = len(promotions) - MAX_TRACKED_PROMOTIONS
+    if excess <= 0:
+        return
+    for promotion_id in [k for k, job in promotions.items() if job["status"] in ("completed", "failed")][:excess]:
+        del promotions[promotion_id]
+
+def submit_promotion(dry_run: bool = True, include_flagged: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Starts a promotion in the background and returns its job record.
+    A dry run only computes the diff. Raises PromotionInProgress if another promotion is writing.
+    """
+    if not dry_run and any(not job["dryRun"] and job["status"] == "running" for job in promotions.values()):
+        raise PromotionInProgress("A promotion is already running")
+    job = {
+        "promotionId": str(uuid.uuid4()),
+        "status": "running",
+        "dryRun": dry_run,
+        "includeFlagged": include_flagged,
+        "submittedAt": datetime.utcnow(),
+        "finishedAt": None,
+        "counts": {"inserts": 0, "updates": 0, "unchanged": 0, "flagged": 0, "written": 0, "failed": 0},
+        "timings": {},
+        "roundTrips": 0,
+        "diff": None,
+        "failed": [],
+        "error": None,
+    }
+    promotions[job["promotionId"]] = job
+    _forget_old_promotions()
+    task = asyncio.create_task(_run_promotion(job, chunk_size))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
+
+async def _run_promotion(job: Dict[str, Any], chunk_size: int):
+    try:
+        start = time.perf_counter()
+        diff = await compute_promotion_diff(job["includeFlagged"])
+        job["timings"]["diffSeconds"] = round(time.perf_counter() - start, 3)
+        rows = diff.pop("rows")
+        job["diff"] = diff
+        job["counts"].update(
+            inserts=len(diff["inserts"]), updates=len(diff["updates"]),
+            unchanged=diff["unchanged"], flagged=len(diff["flagged"]),
+        )
+        if not job["dryRun"] and rows:
+            start = time.perf_counter()
+            result = await apply_promotion(rows, chunk_size)
+            job["timings"]["writeSeconds"] = round(time.perf_counter() - start, 3)
+            job["counts"]["written"] = result["written"]
+            job["counts"]["failed"] = len(result["failed"])
+            job["roundTrips"] = result["round_trips"]
+            job["failed"] = result["failed"]
+        job["status"] = "completed"
+        log_event(
+            "promotion_completed", promotionId=job["promotionId"], dryRun=job["dryRun"],
+            roundTrips=job["roundTrips"], timings=job["timings"], **job["counts"],
+        )
+        for failure in job["failed"]:
+            log_event("promotion_write_failed", logging.ERROR, promotionId=job["promotionId"], fullName=failure["full_name"], error=failure["error"])
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+        log_event("promotion_failed", logging.ERROR, promotionId=job["promotionId"], dryRun=job["dryRun"], error=str(e))
+    finally:
+        job["finishedAt"] = datetime.utcnow()
+        job["timings"]["totalSeconds"] = round((job["finishedAt"] - job["submittedAt"]).total_seconds(), 3)
+
+if __name__ == "__main__":
+    # python -m app.services.promotion prints the diff; add --apply to write it
+    import json
+    import sys
+
+    async def main():
+        diff = await compute_promotion_diff("--include-flagged" in sys.argv)
+        rows = diff.pop("rows")
+        print(json.dumps(diff, indent=2, ensure_ascii=False, default=str))
+        if "--apply" in sys.argv and rows:
+            result = await apply_promotion(rows)
+            print(f"Wrote {result['written']} rows to profiles in {result['round_trips']} round trips.")
+            for failure in result["failed"]:
+                print(f"Failed to promote '{failure['full_name']}': {failure['error']}")
+
+    asyncio.run(main())
@@ -0,0 +1,185 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional
+from app.database.db import table, execute
+
+PROFILES_TABLE = "profiles"
+# Columns served to the public site, in response order
+PUBLIC_COLUMNS = [
+    "full_name", "bachelor_course", "masters_course", "ddp_or_minor",
+    "intake_batch", "overseas_experience", "self_writeup", "picture_url",
+    "notable_achievements", "hobbies", "linkedin_link",
+    "instagram_link", "github_link", "last_modified"
+]
+DEFAULT_PAGE_SIZE = int(os.getenv("PUBLIC_PAGE_SIZE", "24"))
+MAX_PAGE_SIZE = 100
+# Total bytes of cached response bodies before the least recently used are evicted
+PUBLIC_CACHE_MAX_BYTES = int(os.getenv("PUBLIC_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Seconds a cached response is served before it is read again. Bounds staleness when
+# profiles change outside this process (e.g. a json_to_csv run without an invalidate URL).
+PUBLIC_CACHE_TTL_SECONDS = float(os.getenv("PUBLIC_CACHE_TTL_SECONDS", "300"))
+# max-age sent to browsers and CDNs; they revalidate with If-None-Match afterwards
+PUBLIC_CACHE_MAX_AGE = int(os.getenv("PUBLIC_CACHE_MAX_AGE", "60"))
+
+class InvalidCursor(ValueError):
+    pass
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    stored_at: float
+
+class ResponseCache:
+    """
+    In-process LRU cache of serialised JSON responses, bounded by total body size.
+    Concurrent misses on the same key share one load, so a burst of identical requests
+    costs a single Supabase query. invalidate() drops everything, and loads that were
+    already in flight when it was called are returned but not stored.
+    """
+
+    def __init__(self, max_bytes: int = PUBLIC_CACHE_MAX_BYTES, ttl: float = PUBLIC_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+        self._loading: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    async def get_or_load(self, key: str, load: Callable[[], Awaitable[Any]]) -> CachedResponse:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry.stored_at < self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        task = self._loading.get(key)
+        if task is None:
+            self.misses += 1
+            task = self._loading[key] = asyncio.ensure_future(self._load(key, load, self._generation))
+            task.add_done_callback(lambda done: self._loading.pop(key) if self._loading.get(key) is done else None)
+        else:
+            self.hits += 1
+        # Shielded so one cancelled request doesn't cancel the load the others are waiting on
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, load: Callable[[], Awaitable[Any]], generation: int) -> CachedResponse:
+        body = json.dumps(await load(), ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+        entry = CachedResponse(body, f'"{hashlib.sha1(body).hexdigest()}"', time.monotonic())
+        if generation == self._generation:
+            self._store(key, entry)
+        return entry
+
+    def _store(self, key: str, entry: CachedResponse):
+        if len(entry.body) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old.body)
+        self._entries[key] = entry
+        self._bytes += len(entry.body)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.body)
+
+    def invalidate(self):
+        self._entries.clear()
+        self._bytes = 0
+        self._generation += 1
+
+profile_cache = ResponseCache()
+
+def invalidate_public_cache():
+    """Drops all cached public responses. Call after profiles change."""
+    profile_cache.invalidate()
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches etag (weak comparison, as RFC 9110 asks for GET)."""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or etag in (c[2:] if c.startswith("W/") else c for c in candidates)
+
+def encode_cursor(full_name: str) -> str:
+    return base64.urlsafe_b64encode(full_name.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        name = base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor("Invalid cursor")
+    if not name:
+        raise InvalidCursor("Invalid cursor")
+    return name
+
+def escape_like(text: str) -> str:
+    """Escapes LIKE wildcards so text matches literally. PostgREST treats * as %, so it is dropped."""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_").replace("*", "")
+
+def normalize_prefix(prefix: Optional[str]) -> Optional[str]:
+    if prefix is None:
+        return None
+    prefix = " ".join(prefix.split()).lower()
+    return prefix or None
+
+async def list_profiles(
+    intake_batch: Optional[str] = None,
+    bachelor_course: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> Dict[str, Any]:
+    """
+    One page of profiles ordered by full_name, with keyset pagination:
+    nextCursor encodes the last name on the page and is None on the last page.
+    """
+    query = table(PROFILES_TABLE).select(",".join(PUBLIC_COLUMNS)).order("full_name").limit(limit + 1)
+    if intake_batch:
+        query = query.eq("intake_batch", intake_batch)
+    if bachelor_course:
+        query = query.eq("bachelor_course", bachelor_course)
+    if name_prefix:
+        query = query.ilike("full_name", escape_like(name_prefix) + "%")
+    if cursor:
+        query = query.gt("full_name", decode_cursor(cursor))
+    rows = (await execute(query)).data or []
+    next_cursor = encode_cursor(rows[limit - 1]["full_name"]) if len(rows) > limit else None
+    return {"items": rows[:limit], "nextCursor": next_cursor}
+
+async def get_profile(full_name: str) -> Optional[Dict[str, Any]]:
+    query = table(PROFILES_TABLE).select(",".join(PUBLIC_COLUMNS)).eq("full_name", full_name).limit(1)
+    rows = (await execute(query)).data or []
+    return rows[0] if rows else None
+
+async def cached_profile_page(
+    intake_batch: Optional[str] = None,
+    bachelor_course: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> CachedResponse:
+    name_prefix = normalize_prefix(name_prefix)
+    if cursor:
+        decode_cursor(cursor)  # reject bad cursors before they get a cache entry
+    key = json.dumps(["list", intake_batch, bachelor_course, name_prefix, cursor, limit])
+    return await profile_cache.get_or_load(
+        key, lambda: list_profiles(intake_batch, bachelor_course, name_prefix, cursor, limit)
+    )
+
+async def cached_profile(full_name: str) -> CachedResponse:
+    """The cached response for one profile; its body is null when there is no such profile."""
+    return await profile_cache.get_or_load(json.dumps(["profile", full_name]), lambda: get_profile(full_name))
@@ -0,0 +1,218 @@
+# Metrics and structured logs for the backend.
+# Counters and histograms live in this process and are rendered in the Prometheus text
+# format by GET /metrics (app/api/metrics.py). Upload stages are timed with a StageTimer,
+# Supabase calls by db.execute and HTTP requests by RequestTimingMiddleware.
+# Events (duplicates, failures, uploads received) are logged as one JSON object per line.
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Level of the JSON event log written to stderr
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Upper bounds (seconds) of histogram buckets: from fast queries to whole upload stages
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    """A monotonically increasing count per combination of label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in values]
+
+class Histogram:
+    """Observations counted into cumulative buckets per combination of label values, with their sum."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> [count per bucket (not cumulative), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(str(labels.get(name, "")) for name in self.labels))
+        return series[2] if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, [list(counts), total, count]) for key, (counts, total, count) in self._series.items())
+        lines = []
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {count}")
+        return lines
+
+class Gauge:
+    """A value read when metrics are rendered, e.g. a queue depth."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def samples(self) -> List[str]:
+        try:
+            return [f"{self.name} {_number(self.read())}"]
+        except Exception:
+            return []
+
+_registry: List = []
+
+def register(metric):
+    _registry.append(metric)
+    return metric
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+HTTP_REQUEST_SECONDS = register(Histogram(
+    "http_request_duration_seconds", "Time to serve an HTTP request, until its body is sent.", ["method", "route", "status"]
+))
+SUPABASE_REQUEST_SECONDS = register(Histogram(
+    "supabase_request_duration_seconds", "Latency of Supabase (PostgREST) calls.", ["table", "action"]
+))
+SUPABASE_ERRORS = register(Counter(
+    "supabase_request_errors_total", "Supabase calls that raised.", ["table", "action"]
+))
+UPLOAD_STAGE_SECONDS = register(Histogram(
+    "upload_stage_duration_seconds", "Time an upload spent in each pipeline stage.", ["stage"]
+))
+UPLOADS = register(Counter("uploads_total", "Uploads processed, by outcome.", ["status"]))
+UPLOAD_ROWS = register(Counter(
+    "upload_rows_total", "Rows handled by uploads: read, staged, unchanged, deleted or failed.", ["outcome"]
+))
+UPLOAD_DUPLICATES = register(Counter("upload_duplicate_rows_total", "Rows dropped because a later row had the same name."))
+UPLOAD_FLAGGED = register(Counter("upload_flagged_rows_total", "Staged rows with at least one issue."))
+UPLOAD_NEAR_DUPLICATES = register(Counter("upload_near_duplicate_rows_total", "Staged rows flagged as a possible duplicate of another name."))
+EXPORT_ROWS = register(Counter("export_rows_total", "Rows written by admin exports.", ["table", "format"]))
+UPLOAD_ROUND_TRIPS = register(Counter("upload_db_round_trips_total", "Supabase round trips made writing uploads to staging."))
+
+class StageTimer:
+    """
+    Times the stages of one upload. Nested spans are subtracted from the span around them,
+    so stages that run interleaved (parsing inside deduplication) each get their own time.
+    Not shared between threads: an upload is timed by whichever thread runs each stage in turn.
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self._nested: List[float] = []
+
+    @contextmanager
+    def span(self, stage: str):
+        start = time.perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._nested.pop()
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + elapsed - nested
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def observe(self):
+        """Records the time of every stage in UPLOAD_STAGE_SECONDS."""
+        for stage, seconds in self.seconds.items():
+            UPLOAD_STAGE_SECONDS.observe(seconds, stage=stage)
+
+    def rounded(self) -> Dict[str, float]:
+        return {f"{stage}Seconds": round(seconds, 3) for stage, seconds in self.seconds.items()}
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, event, then the record's fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.utcfromtimestamp(record.created).isoformat(timespec="milliseconds") + "Z",
+            "level": record.levelname,
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+logger = logging.getLogger("escholars")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(JsonFormatter())
+    logger.addHandler(_handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+def log_event(event: str, level: int = logging.INFO, **fields):
+    """Logs event with fields as a JSON line, e.g. log_event("upload_failed", uploadId=..., error=...)."""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
@@ -0,0 +1,126 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Seconds an upload's parse result and job are reused for an identical re-upload
+UPLOAD_CACHE_TTL_SECONDS = float(os.getenv("UPLOAD_CACHE_TTL_SECONDS", "3600"))
+# Total (JSON) bytes of cached parse results before the least recently used are evicted
+UPLOAD_CACHE_MAX_BYTES = int(os.getenv("UPLOAD_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Uploads remembered at most, parsed or not
+UPLOAD_CACHE_MAX_ENTRIES = int(os.getenv("UPLOAD_CACHE_MAX_ENTRIES", "32"))
+
+# Bumped whenever staging is written, so a finished upload is only handed back
+# while staging still holds what it wrote
+staging_version = 0
+
+def bump_staging_version():
+    global staging_version
+    staging_version += 1
+
+def is_current(entry: Dict[str, Any]) -> bool:
+    """Whether the upload in entry completed and nothing has written staging since."""
+    return entry["stagingVersion"] == staging_version
+
+# JSON bytes per staging row outside its hashed content: the content_hash and last_modified entries
+UNHASHED_BYTES_PER_ROW = 130
+# JSON bytes per duplicate row (three short keys, a name and two indexes)
+DUPLICATE_ROW_BYTES = 120
+
+def parsed_size(content_bytes: int, staging_row_count: int, duplicate_rows: List[Dict[str, Any]]) -> int:
+    """
+    Bytes of a parse result as JSON, the measure the cache is bounded by. Estimated from the
+    content bytes summed as the rows were hashed, so the result is never serialised again.
+    """
+    return content_bytes + staging_row_count * UNHASHED_BYTES_PER_ROW + len(duplicate_rows) * DUPLICATE_ROW_BYTES
+
+class UploadCache:
+    """
+    Uploads by key (file hash + rule versions), each entry holding:
+    uploadId of the last job for that content, stagingVersion once that job completed,
+    and the parse result (staging rows, duplicate rows, progress and header report).
+    Entries expire after ttl; parse results are evicted least recently used past max_bytes.
+    """
+
+    def __init__(self, ttl: float = UPLOAD_CACHE_TTL_SECONDS, max_bytes: int = UPLOAD_CACHE_MAX_BYTES, max_entries: int = UPLOAD_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [k for k, entry in self._entries.items() if now - entry["storedAt"] > self.ttl]:
+            self._drop(key)
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry["size"]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        self._expire()
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def remember_upload(self, key: str, upload_id: str):
+        """Records the job now handling this content; an older parse result is kept for it to reuse."""
+        self._expire()
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = {"uploadId": upload_id, "stagingVersion": None, "parsed": None, "size": 0, "storedAt": time.monotonic()}
+        entry.update(uploadId=upload_id, stagingVersion=None, storedAt=time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def store_parsed(self, key: str, staging_rows: List[Dict[str, Any]], duplicate_rows: List[Dict[str, Any]], progress: Dict[str, int], header_report: Dict[str, Any], size: int):
+        """Caches a parse result; size is its footprint in bytes (see parsed_size)."""
+        entry = self._entries.get(key)
+        if entry is None or size > self.max_bytes:
+            return
+        self._bytes += size - entry["size"]
+        entry.update(
+            parsed={"stagingRows": staging_rows, "duplicateRows": duplicate_rows, "progress": dict(progress), "headerReport": dict(header_report or {})},
+            size=size,
+            storedAt=time.monotonic(),
+        )
+        self._entries.move_to_end(key)
+        # Evict the parse results of the least recently used uploads; their job ids stay remembered
+        for other in list(self._entries):
+            if self._bytes <= self.max_bytes:
+                break
+            if other != key and self._entries[other]["parsed"] is not None:
+                self._bytes -= self._entries[other]["size"]
+                self._entries[other].update(parsed=None, size=0)
+
+    def get_parsed(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        The cached parse result itself, shared by every upload of the same content: callers copy it
+        before changing its rows, off the event loop since a copy of tens of MiB takes a while.
+        """
+        entry = self.get(key)
+        if entry is None:
+            return None
+        return entry["parsed"]
+
+    def mark_completed(self, key: str, upload_id: str):
+        """Records that upload_id staged every row of this content, as of the current staging version."""
+        entry = self._entries.get(key)
+        if entry is not None and entry["uploadId"] == upload_id:
+            entry["stagingVersion"] = staging_version
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+cache = UploadCache()
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Optional
+from app.services import upload_cache
+from app.services.header_map import MAPPING_VERSION
+from app.services.picture_links import PICTURE_CHECK_MODE
+from app.services.profile_service import CLEANING_RULES_VERSION, STAGING_SYNC_MODE, process_profiles_file, new_progress
+from app.services.telemetry import Gauge, StageTimer, UPLOADS, log_event, register
+
+# Uploads waiting for a worker; further submissions are rejected when full
+UPLOAD_QUEUE_SIZE = int(os.getenv("UPLOAD_QUEUE_SIZE", "8"))
+# Uploads processed concurrently, each with its own parsing thread
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2"))
+# Rows that failed to write listed in an upload's status (progress.failed counts them all)
+MAX_REPORTED_FAILED_ROWS = int(os.getenv("UPLOAD_MAX_REPORTED_FAILED_ROWS", "10"))
+# Finished jobs kept for status lookups before the oldest are forgotten
+MAX_TRACKED_JOBS = int(os.getenv("UPLOAD_MAX_TRACKED_JOBS", "500"))
+
+# completed_with_errors: staged, but some rows failed to write; such a job is never reused,
+# so uploading the same file again retries them
+FINISHED_STATUSES = ("completed", "completed_with_errors", "failed")
+
+class UploadQueueFull(Exception):
+    """Raised when the upload queue has no free slot."""
+
+class UploadQueueUnavailable(Exception):
+    """Raised when no workers are running to take the upload."""
+
+jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_queue: Optional[asyncio.Queue] = None
+_workers: list = []
+_executor: Optional[ThreadPoolExecutor] = None
+
+def get_job(upload_id: str) -> Optional[Dict[str, Any]]:
+    return jobs.get(upload_id)
+
+def _forget_old_jobs():
+    """Drop the oldest finished jobs once more than MAX_TRACKED_JOBS are tracked."""
+    excess = len(jobs) - MAX_TRACKED_JOBS
+    if excess <= 0:
+        return
+    for upload_id in [k for k, job in jobs.items() if job["status"] in FINISHED_STATUSES][:excess]:
+        del jobs[upload_id]
+
+def upload_cache_key(content_hash: str) -> str:
+    """Identifies what an upload stages: the file content and every rule version that shapes the result."""
+    return f"{content_hash}:{MAPPING_VERSION}:{CLEANING_RULES_VERSION}:{STAGING_SYNC_MODE}:{PICTURE_CHECK_MODE}"
+
+def find_reusable_job(cache_key: str) -> Optional[Dict[str, Any]]:
+    """
+    The job of an earlier identical upload that can stand in for a new one: still queued or
+    processing, or completed (every row written) with nothing written to staging since.
+    """
+    entry = upload_cache.cache.get(cache_key)
+    job = jobs.get(entry["uploadId"]) if entry else None
+    if job is None:
+        return None
+    if job["status"] in ("queued", "processing"):
+        return job
+    if job["status"] == "completed" and upload_cache.is_current(entry):
+        return job
+    return None
+
+def submit_upload(upload_id: str, file_path: str, filename: str, submitted_at: datetime, content_hash: str = None) -> Dict[str, Any]:
+    """
+    Queues an upload for processing and starts tracking it.
+    With content_hash, an identical earlier upload is returned instead when its result still
+    stands (the spooled file is removed), and otherwise its cached parse result is reused.
+    Raises UploadQueueUnavailable if workers aren't running and UploadQueueFull if the queue is full.
+    """
+    cache_key = upload_cache_key(content_hash) if content_hash else None
+    if cache_key:
+        previous = find_reusable_job(cache_key)
+        if previous is not None:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+            log_event("upload_reused", uploadId=upload_id, previousUploadId=previous["uploadId"], status=previous["status"])
+            UPLOADS.inc(status="reused")
+            return previous
+    if _queue is None or not _workers:
+        raise UploadQueueUnavailable("Upload workers are not running")
+    job = {
+        "uploadId": upload_id,
+        "filename": filename,
+        "status": "queued",
+        "submittedAt": submitted_at,
+        "startedAt": None,
+        "finishedAt": None,
+        "progress": new_progress(),
+        "roundTrips": 0,
+        "unknownHeaders": [],
+        "ambiguousHeaders": {},
+        "contentHash": content_hash,
+        "timings": {},
+        "failedRows": [],
+        "error": None,
+    }
+    try:
+        _queue.put_nowait((job, file_path, cache_key))
+    except asyncio.QueueFull:
+        raise UploadQueueFull(f"Upload queue is full ({UPLOAD_QUEUE_SIZE} pending)")
+    jobs[upload_id] = job
+    _forget_old_jobs()
+    if cache_key:
+        upload_cache.cache.remember_upload(cache_key, upload_id)
+    return job
+
+def queue_depth() -> int:
+    return _queue.qsize() if _queue is not None else 0
+
+register(Gauge("upload_queue_depth", "Uploads waiting for a worker.", queue_depth))
+register(Gauge("upload_cache_bytes", "Bytes of parse results held by the upload cache.", lambda: upload_cache.cache.size_bytes))
+
+async def _worker():
+    while True:
+        job, file_path, cache_key = await _queue.get()
+        job["status"] = "processing"
+        job["startedAt"] = datetime.utcnow()
+        header_report = {}
+        timer = StageTimer()
+        try:
+            result = await process_profiles_file(
+                file_path, job["filename"], job["uploadId"],
+                progress=job["progress"], executor=_executor, header_report=header_report,
+                cache_key=cache_key, timer=timer,
+            )
+            job["roundTrips"] = result["round_trips"]
+            job["failedRows"] = [
+                {"fullName": failure["full_name"], "error": failure["error"]}
+                for failure in result["failed"][:MAX_REPORTED_FAILED_ROWS]
+            ]
+            if result["failed"]:
+                job["status"] = "completed_with_errors"
+            else:
+                job["status"] = "completed"
+                if cache_key:
+                    upload_cache.cache.mark_completed(cache_key, job["uploadId"])
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+            log_event("upload_failed", logging.ERROR, uploadId=job["uploadId"], filename=job["filename"], error=str(e))
+        finally:
+            # Reported even when the upload failed, e.g. a file without a name column
+            job.update(header_report)
+            job["timings"] = timer.rounded()
+            UPLOADS.inc(status=job["status"])
+            job["finishedAt"] = datetime.utcnow()
+            _queue.task_done()
+
+async def start_workers(workers: int = UPLOAD_WORKERS, queue_size: int = UPLOAD_QUEUE_SIZE):
+    """Creates the upload queue and worker pool. Called on app startup."""
+    global _queue, _executor
+    if _workers:
+        return
+    _queue = asyncio.Queue(maxsize=queue_size)
+    _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload")
+    for _ in range(workers):
+        _workers.append(asyncio.create_task(_worker()))
+
+async def stop_workers():
+    """Cancels the workers and shuts the parsing threads down. Called on app shutdown."""
+    global _queue, _executor
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _queue = None
+    _executor = None
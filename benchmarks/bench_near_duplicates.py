@@ -0,0 +1,105 @@
+# Benchmark near-duplicate name detection against a large synthetic profiles table.
+# Upload names are fresh names plus variants of existing ones (spacing, word order, an added
+# English name, a typo); reports the time taken, comparisons made against the all-pairs count,
+# how many planted variants were found, and the cost of bringing a shared index up to date.
+# Run python -m benchmarks.bench_near_duplicates --profiles 50000 --upload 2000 from root directory
+
+import os
+
+os.environ.setdefault("SUPABASE_BACKEND", "local")
+
+import argparse
+import json
+import random
+import time
+from benchmarks.generate_forms import ENGLISH, GIVEN, SURNAMES
+from app.services.near_duplicates import NearDuplicateIndex, SharedIndex
+
+SYLLABLE_STARTS = ["b", "ch", "d", "f", "g", "h", "j", "k", "l", "m", "n", "p", "q", "r", "s", "sh", "t", "w", "x", "y", "z"]
+SYLLABLE_ENDS = ["a", "ai", "an", "ang", "ao", "e", "ei", "en", "eng", "i", "ian", "in", "ing", "o", "ong", "u", "un", "uo"]
+
+def _given(rng: random.Random) -> str:
+    if rng.random() < 0.3:
+        return rng.choice(GIVEN)
+    return (rng.choice(SYLLABLE_STARTS) + rng.choice(SYLLABLE_ENDS)).title()
+
+def make_name(rng: random.Random) -> str:
+    name = f"{rng.choice(SURNAMES)} {_given(rng)} {_given(rng)}"
+    english = rng.choice(ENGLISH)
+    return f"{english} {name}" if english and rng.random() < 0.5 else name
+
+def make_variant(rng: random.Random, name: str) -> str:
+    """A name the detector should match with name."""
+    words = name.split()
+    kind = rng.randrange(4)
+    if kind == 0 and len(words) >= 3:
+        return " ".join(words[:-2] + [words[-2] + words[-1].lower()])
+    if kind == 1:
+        return " ".join(words[1:] + words[:1])
+    if kind == 2:
+        return f"{rng.choice([e for e in ENGLISH if e])} {name}"
+    longest = max(range(len(words)), key=lambda i: len(words[i]))
+    word = words[longest]
+    if len(word) >= 5:
+        i = rng.randrange(1, len(word) - 1)
+        words[longest] = word[:i] + word[i + 1:] + word[i] if i < len(word) - 1 else word[:i] + "e"
+        return " ".join(words)
+    return " ".join(words[1:] + words[:1])
+
+def run(profiles: int, upload: int, variant_share: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    existing = list({make_name(rng): None for _ in range(profiles)})
+    planted = {}
+    names = []
+    for _ in range(upload):
+        if rng.random() < variant_share:
+            original = rng.choice(existing)
+            variant = make_variant(rng, original)
+            planted[variant] = original
+            names.append(variant)
+        else:
+            names.append(make_name(rng))
+
+    start = time.perf_counter()
+    index = NearDuplicateIndex(existing)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    matches = {name: index.matches(name) for name in names}
+    match_seconds = time.perf_counter() - start
+
+    # Later uploads reuse the shared index and only add the profiles created since
+    shared = SharedIndex()
+    shared.update("bench", existing)
+    grown = existing + [make_name(rng) for _ in range(len(existing) // 100)]
+    start = time.perf_counter()
+    shared.update("bench", grown)
+    update_seconds = time.perf_counter() - start
+
+    found = sum(1 for variant, original in planted.items() if any(m[0] == original for m in matches[variant]))
+    flagged_fresh = sum(1 for name in names if name not in planted and matches[name])
+    return {
+        "profiles": len(existing),
+        "upload": len(names),
+        "build_seconds": round(build_seconds, 4),
+        "match_seconds": round(match_seconds, 4),
+        "update_seconds": round(update_seconds, 4),
+        "comparisons": index.comparisons,
+        "all_pairs": len(existing) * len(names),
+        "planted_variants": len(planted),
+        "planted_found": found,
+        "fresh_names_flagged": flagged_fresh,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate name detection")
+    parser.add_argument("--profiles", type=int, default=50000)
+    parser.add_argument("--upload", type=int, default=2000)
+    parser.add_argument("--variant-share", type=float, default=0.2, help="share of upload names that are variants of existing ones")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    result = run(args.profiles, args.upload, args.variant_share, args.seed)
+    result["meta"] = vars(args)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# Benchmark the picture_url check stage against a local HTTP stub.
+# The stub serves working images, missing files, private (sign-in redirect) files and
+# hosts that refuse HEAD, each with a fixed delay, and records how many requests overlap.
+# Run python -m benchmarks.bench_pictures --urls 500 --latency-ms 50 from root directory
+
+import os
+
+os.environ.setdefault("SUPABASE_BACKEND", "local")
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.services.picture_links import BROKEN_PICTURE_ISSUE, PictureChecker
+from app.services.profile_service import validate_pictures
+
+class StubHandler(BaseHTTPRequestHandler):
+    """/ok/* is an image, /missing/* a 404, /private/* redirects to an HTML sign-in page, /nohead/* refuses HEAD."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self, head: bool):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.requests += 1
+        try:
+            time.sleep(server.latency)
+            kind = self.path.strip("/").split("/")[0]
+            if kind == "nohead" and head:
+                status, headers = 405, {}
+            elif kind in ("ok", "nohead"):
+                status, headers = 200, {"Content-Type": "image/jpeg"}
+            elif kind == "private":
+                status, headers = 302, {"Location": "/signin"}
+            elif kind == "signin":
+                status, headers = 200, {"Content-Type": "text/html; charset=utf-8"}
+            else:
+                status, headers = 404, {"Content-Type": "text/html"}
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def do_HEAD(self):
+        self._respond(head=True)
+
+    def do_GET(self):
+        self._respond(head=False)
+
+def start_stub(latency_ms: float) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency_ms / 1000
+    server.lock = threading.Lock()
+    server.in_flight = server.max_in_flight = server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def make_rows(port: int, urls: int, seed: int) -> list:
+    """Staging rows whose picture URLs are spread over two host names (127.0.0.1 and localhost)."""
+    rng = random.Random(seed)
+    kinds = ["ok"] * 7 + ["missing", "private", "nohead"]
+    rows = []
+    for i in range(urls):
+        host = rng.choice(["127.0.0.1", "localhost"])
+        rows.append({"full_name": f"Student {i}", "picture_url": f"http://{host}:{port}/{rng.choice(kinds)}/{i}.jpg", "issues": None})
+    return rows
+
+async def run(urls: int, latency_ms: float, concurrency: int, per_host: int, seed: int) -> dict:
+    server = start_stub(latency_ms)
+    try:
+        checker = PictureChecker(concurrency=concurrency, per_host=per_host)
+        rows = make_rows(server.server_address[1], urls, seed)
+        result = {}
+        for name in ("cold", "cached"):
+            server.requests = server.max_in_flight = 0
+            start = time.perf_counter()
+            checked = await validate_pictures([dict(row) for row in rows], mode="check", checker=checker)
+            seconds = time.perf_counter() - start
+            result[name] = {
+                "seconds": round(seconds, 4),
+                "urls_per_second": round(urls / seconds, 1) if seconds else None,
+                "requests": server.requests,
+                "max_in_flight": server.max_in_flight,
+                "broken": sum(1 for row in checked if BROKEN_PICTURE_ISSUE in (row["issues"] or [])),
+            }
+        return result
+    finally:
+        server.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark picture_url checks against a local HTTP stub")
+    parser.add_argument("--urls", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    result = asyncio.run(run(args.urls, args.latency_ms, args.concurrency, args.per_host, args.seed))
+    result["meta"] = vars(args)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
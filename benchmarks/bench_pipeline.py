@@ -0,0 +1,150 @@
+# Benchmark the upload pipeline stage by stage on a synthetic form export.
+# The write stages use the local Supabase stand-in (app/database/local_client.py).
+# Run python -m benchmarks.bench_pipeline --rows 2000 --format csv --output bench.json from root directory
+# and pass --compare <previous.json> to flag stages that got slower.
+
+import os
+
+# The write stages run against the in-memory stand-in, so no credentials are needed
+os.environ.setdefault("SUPABASE_BACKEND", "local")
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from app.database.local_client import LocalClient
+from app.database.supabase_client import set_client
+from app.services import profile_service
+from app.services.cleaning import translate_columns, clean_columns, iter_column_records
+from benchmarks.generate_forms import FORM_VARIANTS, write_form
+
+STAGES = ["read", "translate", "clean", "dedupe", "issues", "write", "rewrite"]
+
+def run_stages(path: str, engine: str, sync_mode: str, latency_ms: float = 0.0, trace_memory: bool = False) -> dict:
+    """Runs each pipeline stage once and returns {stage: {"seconds", "peak_mib"}} plus I/O for the write stages."""
+    local = LocalClient(latency_ms=latency_ms)
+    set_client(local)
+    results = {}
+    data = {}
+
+    def stage(name, fn):
+        if trace_memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        data[name] = fn()
+        seconds = time.perf_counter() - start
+        results[name] = {"seconds": seconds}
+        if trace_memory:
+            results[name]["peak_mib"] = (tracemalloc.get_traced_memory()[1] - before) / 2 ** 20
+
+    filename = os.path.basename(path)
+    now = datetime.utcnow().isoformat()
+    stage("read", lambda: list(profile_service.iter_profile_frames(path, filename)))
+    if engine == "frame":
+        stage("translate", lambda: [translate_columns(frame) for frame in data["read"]])
+        stage("clean", lambda: [row for columns in data["translate"] for row in iter_column_records(clean_columns(columns))])
+    else:
+        stage("translate", lambda: [profile_service.translate_row_keys(row) for frame in data["read"] for row in frame.to_dict(orient="records")])
+        stage("clean", lambda: [profile_service.clean_row_fields(row) for row in data["translate"]])
+    stage("dedupe", lambda: profile_service.dedupe_rows(data["clean"])[0])
+    stage("issues", lambda: profile_service.build_staging_rows(data["dedupe"], now))
+    for name in ("write", "rewrite"):
+        # rewrite uploads the same rows again, which measures the no-change path
+        local.stats.reset()
+        stage(name, lambda: asyncio.run(profile_service.sync_staging(data["issues"], sync_mode)))
+        results[name]["io"] = _io_totals(local)
+    results["rows_read"] = sum(len(frame) for frame in data["read"])
+    results["rows_staged"] = len(data["issues"])
+    return results
+
+def _io_totals(local: LocalClient) -> dict:
+    summary = local.stats.summary().values()
+    return {
+        "round_trips": local.stats.round_trips,
+        "rows": sum(s["rows"] for s in summary),
+        "bytes_sent": sum(s["bytes_sent"] for s in summary),
+        "bytes_received": sum(s["bytes_received"] for s in summary),
+    }
+
+def benchmark(path: str, engine: str, sync_mode: str, repeat: int, latency_ms: float = 0.0) -> dict:
+    """Best-of-repeat stage timings, plus per-stage peak memory from a separate traced run."""
+    timed = [run_stages(path, engine, sync_mode, latency_ms) for _ in range(repeat)]
+    tracemalloc.start()
+    try:
+        traced = run_stages(path, engine, sync_mode, latency_ms, trace_memory=True)
+    finally:
+        tracemalloc.stop()
+
+    rows = timed[0]["rows_read"]
+    stages = {}
+    for name in STAGES:
+        seconds = min(run[name]["seconds"] for run in timed)
+        stages[name] = {
+            "seconds": round(seconds, 6),
+            "rows_per_second": round(rows / seconds, 1) if seconds else None,
+            "peak_mib": round(traced[name]["peak_mib"], 3),
+        }
+        if "io" in timed[0][name]:
+            stages[name]["io"] = timed[0][name]["io"]
+    return {"rows_read": rows, "rows_staged": timed[0]["rows_staged"], "stages": stages}
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Stages whose time grew by more than tolerance (a fraction) since the baseline run."""
+    regressions = []
+    for name, stage in current["stages"].items():
+        before = baseline.get("stages", {}).get(name)
+        if not before or not before.get("seconds"):
+            continue
+        change = stage["seconds"] / before["seconds"] - 1
+        if change > tolerance:
+            regressions.append(f"{name}: {before['seconds']:.4f}s -> {stage['seconds']:.4f}s (+{change:.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the profile upload pipeline")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--format", choices=["csv", "xlsx"], default="csv")
+    parser.add_argument("--variant", choices=sorted(FORM_VARIANTS), default="v1")
+    parser.add_argument("--duplicates", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=["frame", "row"], default=profile_service.CLEANING_ENGINE)
+    parser.add_argument("--sync-mode", choices=["incremental", "replace"], default=profile_service.STAGING_SYNC_MODE)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated Supabase round-trip latency")
+    parser.add_argument("--input", help="benchmark an existing export instead of generating one")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="previous results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown per stage before it counts as a regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.input or write_form(
+            os.path.join(tmp, f"bench.{args.format}"), args.rows, args.variant, args.duplicates, args.seed
+        )
+        result = benchmark(path, args.engine, args.sync_mode, args.repeat, args.latency_ms)
+
+    result["meta"] = {
+        "rows": args.rows, "format": args.format, "variant": args.variant, "duplicates": args.duplicates,
+        "seed": args.seed, "engine": args.engine, "sync_mode": args.sync_mode, "repeat": args.repeat, "latency_ms": args.latency_ms,
+        "input": args.input, "python": platform.python_version(), "timestamp": datetime.utcnow().isoformat(),
+    }
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
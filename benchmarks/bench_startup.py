@@ -0,0 +1,118 @@
+# Benchmark cold start: how long `import app.main` takes, which heavy libraries it loads,
+# and how long a fresh uvicorn process takes to answer its first request.
+# Every measurement runs in a new interpreter, against the in-memory Supabase stand-in.
+# Run python -m benchmarks.bench_startup --repeat 5 --output startup.json from root directory
+# and pass --compare <previous.json> to flag a slower start.
+
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["pandas", "numpy", "chardet", "openpyxl", "supabase", "httpx"]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "loaded": [m for m in %r if m in sys.modules], "modules": len(sys.modules)}))
+""" % (HEAVY_MODULES,)
+
+def _env() -> dict:
+    env = dict(os.environ, SUPABASE_BACKEND="local", PYTHONPATH=ROOT)
+    # No credentials: the app must start without them
+    env.pop("SUPABASE_URL", None)
+    env.pop("SUPABASE_KEY", None)
+    return env
+
+def measure_import() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT], cwd=ROOT, env=_env(), capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def measure_first_response(path: str, timeout: float = 30.0) -> float:
+    """Seconds from spawning uvicorn until path first answers 200."""
+    port = _free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.005)
+        raise TimeoutError(f"No response from {path} within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+def benchmark(repeat: int, path: str) -> dict:
+    imports = [measure_import() for _ in range(repeat)]
+    first_responses = [measure_first_response(path) for _ in range(repeat)]
+    return {
+        "import_seconds": round(statistics.median(run["seconds"] for run in imports), 4),
+        "first_response_seconds": round(statistics.median(first_responses), 4),
+        "heavy_modules_loaded": imports[0]["loaded"],
+        "modules_loaded": imports[0]["modules"],
+    }
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Measurements that grew by more than tolerance (a fraction) since the baseline run."""
+    regressions = []
+    for key in ("import_seconds", "first_response_seconds"):
+        before, after = baseline.get(key), current[key]
+        if before and after / before - 1 > tolerance:
+            regressions.append(f"{key}: {before:.4f}s -> {after:.4f}s (+{after / before - 1:.0%})")
+    for module in current["heavy_modules_loaded"]:
+        if module not in baseline.get("heavy_modules_loaded", []):
+            regressions.append(f"{module} is now imported at startup")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app import time and time to first response")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--path", default="/profiles?limit=1", help="request used for time to first response")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="previous results JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before it counts as a regression")
+    args = parser.parse_args()
+
+    result = benchmark(args.repeat, args.path)
+    result["meta"] = {
+        "repeat": args.repeat, "path": args.path,
+        "python": platform.python_version(), "timestamp": datetime.utcnow().isoformat(),
+    }
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
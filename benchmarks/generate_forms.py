@@ -0,0 +1,161 @@
+# Generate synthetic Google Form exports for benchmarking uploads.
+# Run python -m benchmarks.generate_forms --rows 2000 --output ./data/bench.csv from root directory
+
+import argparse
+import csv
+import random
+from datetime import datetime, timedelta
+from app.services.header_map import COLUMN_NAME_MAP
+
+# Header rows of the form versions seen so far. Together they cover every COLUMN_NAME_MAP key
+# plus the unmapped bachelor course sources and the columns Google Forms always adds.
+FORM_VARIANTS = {
+    "v1": [
+        "Timestamp", "Email Address", "Name", "B.Eng. Major",
+        "Special Programmes (DDP outside of CDE, Second Majors, Minors)", "Year of Admission",
+        "(If applicable) Where did you go (or will be going) for SEP/summer/winter (school), NOC (location and company), internships (company)",
+        "Please provide a short write-up of yourself.", "Upload a picture of yourself.",
+        "Notable Achievements (max 3)", "Any interests/ hobbies (max 3)",
+        "Linkedin Profile URL", "Instagram Profile URL", "Github Profile URL",
+    ],
+    "v2": [
+        "Timestamp", "Email Address", "Full Name (as per NRIC)", "Major", "Major (in full)",
+        "Specialisation in ...", "Second Major in ...", "Minor in ...", "Year of Admission",
+        "Self write-up (e.g. Yuxuan's self write-up below). It'll be publicly available so you can also use it as a personal showcase page! (Limit: 200 words)",
+        "Upload a picture of yourself! Example on the right",
+        "Notable Achievements (if any, up to 3!) Example on the right",
+        "Any interests/hobbies? (Up to 3!) Example on the right",
+        "LinkedIn Link (if any)", "Instagram Link (if any)",
+    ],
+}
+
+_missing = set(COLUMN_NAME_MAP) - {h for headers in FORM_VARIANTS.values() for h in headers}
+assert not _missing, f"FORM_VARIANTS is missing COLUMN_NAME_MAP headers: {_missing}"
+
+SURNAMES = ["Tan", "Lim", "Lee", "Ng", "Wong", "Goh", "Chua", "Koh", "Teo", "Ong", "Kumar", "Rahman", "Singh", "Chen", "Wang"]
+GIVEN = ["Wei", "Ming", "Jun", "Hui", "Xin", "Yi", "Jia", "Kai", "Zhi", "Hao", "Ling", "Siti", "Arjun", "Nur", "Yu"]
+ENGLISH = ["John", "Rachel", "Marcus", "Chloe", "Ethan", "Megan", ""]
+COURSES = [
+    "MPE - Mechanical Engineering", "MPE - Mechanical Engineering;", "CDE - Computer Engineering",
+    "Multidisciplinary Programme (Computer Engineering)", "Electrical Engineering", "BME - Biomedical Engineering",
+    "Civil Engineering", "Chemical Engineering;", "ISE - Industrial and Systems Engineering",
+]
+MINORS = ["", "", "Minor in Business", "Second Major in Management", "DDP with Economics", "Specialisation in Robotics"]
+POINTS = [
+    "Dean's List AY22/23", "won hackathon finals", "Led a robotics team", "published a paper",
+    "tutored juniors", "Represented NUS in badminton", "built a startup", "interned at GovTech",
+]
+HOBBIES = ["badminton", "piano", "hiking", "photography", "cooking", "reading", "rock climbing", "chess"]
+
+def _name(rng: random.Random) -> str:
+    name = f"{rng.choice(SURNAMES)} {rng.choice(GIVEN)} {rng.choice(GIVEN)}"
+    english = rng.choice(ENGLISH)
+    return f"{english} {name}" if english else name
+
+def _bullets(rng: random.Random, items) -> str:
+    """A few points in one of the messy formats people type into the form."""
+    chosen = rng.sample(items, rng.randint(1, 3))
+    style = rng.randrange(7)
+    if style == 0:
+        return "\n".join(f"{i}. {p}" for i, p in enumerate(chosen, 1))
+    if style == 1:
+        return "\n".join(f"- {p}" for p in chosen)
+    if style == 2:
+        return " • ".join(chosen)
+    if style == 3:
+        return ", ".join(chosen)
+    if style == 4:
+        return "\r\n".join(f"* {p}" for p in chosen)
+    if style == 5:
+        return "; ".join(chosen)
+    return ""
+
+def _social(rng: random.Random, site: str, handle: str) -> str:
+    """A social link that is valid, bare, missing its scheme or blank."""
+    path = {"linkedin": f"linkedin.com/in/{handle}", "instagram": f"instagram.com/{handle}", "github": f"github.com/{handle}"}[site]
+    style = rng.randrange(5)
+    if style == 0:
+        return f"https://{path}"
+    if style == 1:
+        return f"https://www.{path}"
+    if style == 2:
+        return f"@{handle}"
+    if style == 3:
+        return f"www.{path}"
+    return ""
+
+def _value(header: str, rng: random.Random, name: str, submitted: datetime) -> str:
+    target = COLUMN_NAME_MAP.get(header, header)
+    handle = name.lower().replace(" ", "")
+    if header == "Timestamp":
+        return submitted.strftime("%m/%d/%Y %H:%M:%S")
+    if header == "Email Address":
+        return f"{handle}@u.nus.edu"
+    if header in ("B.Eng. Major", "Major"):
+        return rng.choice(COURSES) if rng.random() > 0.05 else ""
+    if target == "full_name":
+        return name
+    if target == "masters_course":
+        return rng.choice(["", "", "Master of Science (Robotics)"])
+    if target == "ddp_or_minor":
+        return rng.choice(MINORS)
+    if target == "intake_batch":
+        year = rng.randint(19, 24)
+        return rng.choice([f"AY{year}/{year + 1}", f"AY{year}/{year + 1} (Aug intake)", f"20{year}"])
+    if target == "overseas_experience":
+        return rng.choice(["", "SEP at KTH", "NOC Silicon Valley", "Summer school in Seoul"])
+    if target == "self_writeup":
+        return " ".join(rng.choice(POINTS + HOBBIES) for _ in range(rng.randint(10, 60)))
+    if target == "picture_url":
+        return f"https://drive.google.com/open?id={rng.getrandbits(64):016x}"
+    if target == "notable_achievements":
+        return _bullets(rng, POINTS)
+    if target == "hobbies":
+        return _bullets(rng, HOBBIES)
+    if target in ("linkedin_link", "instagram_link", "github_link"):
+        return _social(rng, target.split("_")[0], handle)
+    return ""
+
+def generate_rows(rows: int, variant: str = "v1", duplicate_rate: float = 0.1, seed: int = 0):
+    """Yields the header row, then rows of synthetic answers. About duplicate_rate of the names repeat an earlier one."""
+    rng = random.Random(seed)
+    headers = FORM_VARIANTS[variant]
+    yield headers
+    names = []
+    submitted = datetime(2024, 8, 1)
+    for _ in range(rows):
+        if names and rng.random() < duplicate_rate:
+            # Resubmissions, sometimes typed in a different case
+            name = rng.choice(names)
+            name = rng.choice([name, name.lower(), name.upper()])
+        else:
+            name = _name(rng)
+            names.append(name)
+        submitted += timedelta(seconds=rng.randint(1, 600))
+        yield [_value(h, rng, name, submitted) for h in headers]
+
+def write_form(path: str, rows: int, variant: str = "v1", duplicate_rate: float = 0.1, seed: int = 0) -> str:
+    """Writes a synthetic export to path; the format follows the extension (.csv or .xlsx)."""
+    data = generate_rows(rows, variant, duplicate_rate, seed)
+    if path.lower().endswith(".xlsx"):
+        import openpyxl
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet("Form Responses 1")
+        for row in data:
+            sheet.append([v if v != "" else None for v in row])
+        workbook.save(path)
+    else:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(data)
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic intake form export")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--variant", choices=sorted(FORM_VARIANTS), default="v1")
+    parser.add_argument("--duplicates", type=float, default=0.1, help="fraction of rows that repeat an earlier name")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", required=True, help="path ending in .csv or .xlsx")
+    args = parser.parse_args()
+    write_form(args.output, args.rows, args.variant, args.duplicates, args.seed)
+    print(f"Wrote {args.rows} rows ({args.variant}) to {args.output}")
@@ -0,0 +1,16 @@
+import os
+
+# Tests never talk to a real Supabase project
+os.environ.setdefault("SUPABASE_BACKEND", "local")
+
+import pytest
+from app.database.local_client import LocalClient
+from app.database.supabase_client import set_client
+
+@pytest.fixture
+def local_client():
+    """A fresh in-memory backend for the test, with the previous client restored afterwards."""
+    client = LocalClient()
+    previous = set_client(client)
+    yield client
+    set_client(previous)
@@ -0,0 +1,62 @@
+# The frame and row cleaning engines must stage exactly the same rows and issues.
+
+import csv
+import json
+import pytest
+from benchmarks.generate_forms import FORM_VARIANTS, write_form
+from app.services.profile_service import prepare_staging_rows
+
+NOW = "2024-09-01T00:00:00"
+
+# Edge cases the generator doesn't produce: blank (NaN) cells, numbers where text is expected,
+# a repeated header, two headers for the same target and a second major alongside a minor
+EDGE_HEADERS = [
+    "Name", "Full Name (as per NRIC)", "Major", "Second Major in ...", "Minor in ...", "Minor in ...",
+    "Year of Admission", "Any interests/hobbies? (Up to 3!) Example on the right", "Linkedin Profile URL",
+]
+EDGE_ROWS = [
+    ["Tan Wei Ming", "", "Computer Engineering", "Management", "Business", "", "AY22/23", "chess", "linkedin.com/in/twm"],
+    ["", "Lim Jia Hui", "", "Data Science", "Statistics", "Economics", 2023, 42, ""],
+    ["Ng Kai", "Ng Kai Jun", "Civil Engineering;", "", "", "", "", "", None],
+    [12345, "", 3.5, "", "Business", "Economics", "AY21/22 (Aug intake)", "1. piano\n2. hiking", "https://linkedin.com/in/x"],
+    ["tan wei ming", "", "MPE - Mechanical Engineering", "", "", "", 2022.0, "", ""],
+    ["", "", "", "", "", "", "", "", ""],
+    ["Goh Mei Ling", "", "Chemical Engineering", "Economics", "economics ", "Economics", "", "", ""],
+]
+
+def _write_edge_file(path: str) -> str:
+    if path.endswith(".xlsx"):
+        import openpyxl
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(EDGE_HEADERS)
+        for row in EDGE_ROWS:
+            sheet.append([None if v == "" else v for v in row])
+        workbook.save(path)
+    else:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows([EDGE_HEADERS] + EDGE_ROWS)
+    return path
+
+def _stage(path: str, engine: str) -> str:
+    header_report = {}
+    staging_rows, duplicate_rows = prepare_staging_rows(path, path, engine=engine, now=NOW, header_report=header_report)
+    return json.dumps(
+        {"staging": staging_rows, "duplicates": duplicate_rows, "headers": header_report},
+        sort_keys=True, default=repr,
+    )
+
+@pytest.mark.parametrize("extension", ["csv", "xlsx"])
+@pytest.mark.parametrize("variant", sorted(FORM_VARIANTS))
+def test_engines_match_on_generated_forms(tmp_path, variant, extension):
+    path = write_form(str(tmp_path / f"{variant}.{extension}"), rows=400, variant=variant, seed=7)
+    assert _stage(path, "frame") == _stage(path, "row")
+
+@pytest.mark.parametrize("extension", ["csv", "xlsx"])
+def test_engines_match_on_edge_cases(tmp_path, extension):
+    path = _write_edge_file(str(tmp_path / f"edge.{extension}"))
+    frame = _stage(path, "frame")
+    assert frame == _stage(path, "row")
+    staged = {row["full_name"]: row for row in json.loads(frame)["staging"]}
+    assert staged["Lim Jia Hui"]["ddp_or_minor"] == "Data Science; Statistics"
+    assert staged["Goh Mei Ling"]["ddp_or_minor"] == "Economics"
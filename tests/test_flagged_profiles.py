@@ -0,0 +1,70 @@
+# Listing staged profiles by issue.
+
+import asyncio
+import pytest
+from app.services.flagged_profiles import apply_profile_edits, list_flagged_profiles
+from app.services.profile_service import NEAR_DUPLICATE_ISSUE, build_staging_row
+from app.services.promotion import apply_promotion, compute_promotion_diff
+
+def _walk(issue, limit):
+    names, cursor = [], None
+    while True:
+        page = asyncio.run(list_flagged_profiles(issue, cursor, limit))
+        names += [item["profileId"] for item in page["items"]]
+        cursor = page["nextCursor"]
+        if cursor is None:
+            return names
+
+@pytest.fixture
+def flagged(local_client):
+    rows = []
+    for i in range(40):
+        issues = ["Invalid LinkedIn link"] if i % 3 else []
+        if i % 7 == 0:
+            issues.append(f"{NEAR_DUPLICATE_ISSUE} 'Profile {i + 1}' in profiles (spelling)")
+        rows.append({"full_name": f"Profile {i:02d}", "issues": issues or None})
+    local_client.seed("staging", rows)
+    return rows
+
+@pytest.mark.parametrize("limit", [1, 2, 5, 50])
+def test_near_duplicate_issues_match_by_prefix(flagged, limit):
+    expected = [row["full_name"] for row in flagged if any(i.startswith(NEAR_DUPLICATE_ISSUE) for i in row["issues"] or [])]
+    assert expected and _walk(NEAR_DUPLICATE_ISSUE, limit) == expected
+
+def test_other_issues_match_exactly(flagged):
+    expected = [row["full_name"] for row in flagged if "Invalid LinkedIn link" in (row["issues"] or [])]
+    assert _walk("Invalid LinkedIn link", 4) == expected
+    assert _walk("Invalid LinkedIn", 4) == []
+
+def test_dismissed_near_duplicate_can_be_promoted(local_client):
+    issue = f"{NEAR_DUPLICATE_ISSUE} 'Tan Weiming' in profiles (same letters)"
+    local_client.seed("profiles", [{"full_name": "Tan Weiming"}])
+    local_client.seed("staging", [
+        build_staging_row({"full_name": "Tan Wei Ming", "hobbies": ["Chess"]}, [issue]),
+        build_staging_row({"full_name": "Lim Jia Hui"}, [issue.replace("Tan Weiming", "Lim Jiahui")]),
+    ])
+    assert asyncio.run(compute_promotion_diff())["inserts"] == []
+
+    # An edit alone keeps the issue; dismissing it clears the row for promotion
+    edited, = asyncio.run(apply_profile_edits([
+        {"profileId": "Tan Wei Ming", "updatedData": {"hobbies": ["Go"]}, "submittedAt": "2024-09-01T10:00:00"},
+    ]))
+    assert edited["issues"] == [issue]
+    dismissed, = asyncio.run(apply_profile_edits([
+        {"profileId": "Tan Wei Ming", "dismissIssues": [NEAR_DUPLICATE_ISSUE], "submittedAt": "2024-09-01T10:05:00"},
+    ]))
+    assert (dismissed["status"], dismissed["issues"]) == ("resolved", [])
+
+    diff = asyncio.run(compute_promotion_diff())
+    assert diff["inserts"] == ["Tan Wei Ming"]
+    assert [row["full_name"] for row in diff["flagged"]] == ["Lim Jia Hui"]
+    asyncio.run(apply_promotion(diff["rows"]))
+    assert local_client.tables["profiles"]["Tan Wei Ming"]["hobbies"] == ["Go"]
+
+def test_detected_issues_cannot_be_dismissed(local_client):
+    local_client.seed("staging", [build_staging_row({"full_name": "Ng Kai"}, ["Invalid LinkedIn link"])])
+    result, = asyncio.run(apply_profile_edits([
+        {"profileId": "Ng Kai", "dismissIssues": ["Invalid LinkedIn link"], "submittedAt": "2024-09-01T10:00:00"},
+    ]))
+    assert result["status"] == "rejected"
+    assert local_client.tables["staging"]["Ng Kai"]["issues"] == ["Invalid LinkedIn link"]
@@ -0,0 +1,33 @@
+# Keeping the in-process name index fresh without re-reading the table.
+
+import asyncio
+from app.services.name_index import NameIndex
+
+MIGRATED_AT = "2024-09-01T00:00:00+00:00"
+
+def _rows_fetched(client) -> int:
+    return sum(entry["rows"] for key, entry in client.stats.summary().items() if key.endswith(".select"))
+
+def test_refresh_fetches_only_rows_after_the_watermark(local_client):
+    # A migration stamps every profile with the same last_modified
+    local_client.seed("profiles", [{"full_name": f"Profile {i:04d}", "last_modified": MIGRATED_AT} for i in range(2500)])
+    index = NameIndex("profiles", refresh_interval=0)
+    asyncio.run(index.refresh())
+    assert len(index) == 2500
+
+    local_client.stats.reset()
+    asyncio.run(index.refresh())
+    assert _rows_fetched(local_client) == 0
+
+    local_client.seed("profiles", [
+        {"full_name": "Zhang Wei", "last_modified": MIGRATED_AT},
+        {"full_name": "Ang Mei Ling", "last_modified": "2024-09-02T08:00:00+00:00"},
+    ])
+    local_client.stats.reset()
+    asyncio.run(index.refresh())
+    assert _rows_fetched(local_client) == 2
+    assert "Zhang Wei" in index and "Ang Mei Ling" in index
+
+    local_client.stats.reset()
+    asyncio.run(index.refresh())
+    assert _rows_fetched(local_client) == 0
@@ -0,0 +1,72 @@
+# Picture URL normalising and checking, against a mocked httpx transport.
+
+import asyncio
+from collections import Counter
+import httpx
+import pytest
+from app.services.picture_links import PictureChecker, normalize_picture_url
+
+SIGN_IN_URL = "https://accounts.google.com/ServiceLogin"
+
+def _respond(request: httpx.Request) -> httpx.Response:
+    path = request.url.path
+    if request.url.host == "accounts.google.com":
+        return httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"})
+    if path == "/ok.png":
+        return httpx.Response(200, headers={"content-type": "image/png"})
+    if path == "/private.png":
+        return httpx.Response(302, headers={"location": SIGN_IN_URL})
+    if path == "/no-head.jpg":
+        if request.method == "HEAD":
+            return httpx.Response(405)
+        assert request.headers["range"] == "bytes=0-0"
+        return httpx.Response(206, headers={"content-type": "image/jpeg"})
+    return httpx.Response(404)
+
+@pytest.mark.parametrize("url, problem", [
+    ("https://pics.example.com/ok.png", None),
+    ("https://pics.example.com/missing.png", "HTTP 404"),
+    ("https://pics.example.com/private.png", "not an image (text/html)"),
+    ("https://pics.example.com/no-head.jpg", None),
+])
+def test_check_reports_problem(url, problem):
+    checker = PictureChecker(transport=httpx.MockTransport(_respond))
+    assert asyncio.run(checker.check([url])) == {url: problem}
+
+def test_check_reuses_cached_results():
+    checker = PictureChecker(transport=httpx.MockTransport(_respond))
+    urls = ["https://pics.example.com/ok.png", "https://pics.example.com/missing.png"]
+    asyncio.run(checker.check(urls))
+    assert asyncio.run(checker.check(urls + urls)) == dict(zip(urls, [None, "HTTP 404"]))
+    assert (checker.requests, checker.cache_hits) == (2, 2)
+
+def test_check_caps_requests_per_host():
+    in_flight, most = Counter(), Counter()
+
+    async def slow(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        in_flight[host] += 1
+        most[host] = max(most[host], in_flight[host])
+        await asyncio.sleep(0.01)
+        in_flight[host] -= 1
+        return httpx.Response(200, headers={"content-type": "image/png"})
+
+    checker = PictureChecker(concurrency=6, per_host=2, transport=httpx.MockTransport(slow))
+    urls = [f"https://{host}.example.com/{i}.png" for host in ("a", "b", "c", "d") for i in range(10)]
+    results = asyncio.run(checker.check(urls))
+    assert results == dict.fromkeys(urls)
+    assert max(most.values()) == 2
+    assert sum(in_flight.values()) == 0
+
+@pytest.mark.parametrize("raw, url", [
+    ("https://cdn.example.com/w_200,h_200/pic.jpg?crop=1,2", "https://cdn.example.com/w_200,h_200/pic.jpg?crop=1,2"),
+    ("https://a.example.com/1.png, https://b.example.com/2.png", "https://a.example.com/1.png"),
+    (
+        "https://drive.google.com/open?id=abc123,https://drive.google.com/open?id=def456",
+        "https://drive.google.com/uc?export=view&id=abc123",
+    ),
+    ("drive.google.com/file/d/abc123/view?usp=sharing", "https://drive.google.com/uc?export=view&id=abc123"),
+    ("  ", None),
+])
+def test_normalize_picture_url(raw, url):
+    assert normalize_picture_url(raw) == url
@@ -0,0 +1,47 @@
+# Round trips and rows sent to Supabase, counted by the in-memory backend (LocalStats).
+
+import asyncio
+import math
+import pytest
+from benchmarks.generate_forms import write_form
+from app.database.bulk import bulk_upsert
+from app.services.profile_service import prepare_staging_rows, sync_staging
+
+@pytest.fixture
+def staging_rows(tmp_path):
+    path = write_form(str(tmp_path / "form.csv"), rows=300, seed=3)
+    rows, _ = prepare_staging_rows(path, "form.csv", now="2024-09-01T00:00:00")
+    return rows
+
+@pytest.mark.parametrize("rows, chunk_size", [(1, 500), (500, 500), (1234, 500), (1234, 100)])
+def test_bulk_upsert_makes_one_round_trip_per_chunk(local_client, rows, chunk_size):
+    data = [{"full_name": f"Profile {i}"} for i in range(rows)]
+    result = asyncio.run(bulk_upsert("staging", data, chunk_size=chunk_size))
+
+    assert result["written"] == rows
+    assert result["round_trips"] == local_client.stats.round_trips == math.ceil(rows / chunk_size)
+    assert local_client.stats.summary()["staging.upsert"]["rows"] == rows
+
+def test_sync_staging_unchanged_reupload_only_reads(local_client, staging_rows):
+    first = asyncio.run(sync_staging(staging_rows, mode="incremental"))
+    assert first["written"] == len(staging_rows)
+    local_client.stats.reset()
+
+    second = asyncio.run(sync_staging(staging_rows, mode="incremental"))
+    summary = local_client.stats.summary()
+    assert list(summary) == ["staging.select"]
+    assert summary["staging.select"]["calls"] == 1
+    assert second["written"] == second["deleted"] == 0
+    assert second["unchanged"] == len(staging_rows)
+
+def test_sync_staging_writes_only_changed_and_vanished_rows(local_client, staging_rows):
+    asyncio.run(sync_staging(staging_rows, mode="incremental"))
+    local_client.stats.reset()
+
+    changed = dict(staging_rows[0], content_hash="changed")
+    asyncio.run(sync_staging([changed] + staging_rows[2:], mode="incremental"))
+    summary = local_client.stats.summary()
+    assert summary["staging.select"]["calls"] == 1
+    assert (summary["staging.upsert"]["calls"], summary["staging.upsert"]["rows"]) == (1, 1)
+    assert (summary["staging.delete"]["calls"], summary["staging.delete"]["rows"]) == (1, 1)
+    assert local_client.stats.round_trips == 3
@@ -0,0 +1,20 @@
+# Reading uploaded files from disk in chunks.
+
+import csv
+from app.services.profile_service import ENCODING_SAMPLE_BYTES, detect_encoding, iter_profile_frames
+
+def test_csv_with_late_non_utf8_byte_is_read_whole(tmp_path):
+    # ASCII well past the detection sample, with multi-line answers, then one cp1252 name at the end
+    path = tmp_path / "form.csv"
+    rows = [["Name", "Please provide a short write-up of yourself."]]
+    rows += [[f"Student {i}", f"Line one of {i}\nline two"] for i in range(20000)]
+    rows.append(["Renée Tan", "Café owner"])
+    with open(path, "w", newline="", encoding="cp1252") as f:
+        csv.writer(f).writerows(rows)
+    assert path.stat().st_size > ENCODING_SAMPLE_BYTES
+    assert detect_encoding(str(path)) == "utf-8-sig"
+
+    frames = list(iter_profile_frames(str(path), "form.csv", chunk_rows=1000))
+    names = [name for frame in frames for name in frame["Name"]]
+    assert names == [row[0] for row in rows[1:]]
+    assert frames[-1]["Please provide a short write-up of yourself."].iloc[-1] == "Café owner"
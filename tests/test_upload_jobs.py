@@ -0,0 +1,73 @@
+# Uploads processed by concurrent workers.
+
+import asyncio
+import shutil
+from datetime import datetime
+from benchmarks.generate_forms import write_form
+from app.models.profile import UploadStatusResponse
+from app.services import upload_jobs
+from app.services.profile_service import prepare_staging_rows, process_profiles_file
+
+def _names(path: str) -> set:
+    rows, _ = prepare_staging_rows(path, path)
+    return {row["full_name"] for row in rows}
+
+def test_concurrent_uploads_leave_staging_equal_to_one_of_them(local_client, tmp_path):
+    paths = [write_form(str(tmp_path / f"form{i}.csv"), rows=60, seed=i) for i in range(2)]
+    expected = [_names(path) for path in paths]
+    assert expected[0] != expected[1]
+    # Latency makes the two diff-then-write stages overlap unless they are serialized
+    local_client.latency_ms = 5
+
+    async def main():
+        await asyncio.gather(*(
+            process_profiles_file(path, "form.csv", f"upload-{i}", chunk_size=10) for i, path in enumerate(paths)
+        ))
+
+    asyncio.run(main())
+    assert set(local_client.tables["staging"]) in expected
+
+async def _run_upload(upload_id: str, path: str, content_hash: str) -> dict:
+    job = upload_jobs.submit_upload(upload_id, path, "form.csv", datetime.utcnow(), content_hash)
+    while job["status"] in ("queued", "processing"):
+        await asyncio.sleep(0.01)
+    return job
+
+def test_upload_with_failed_rows_is_retried_not_reused(local_client, tmp_path):
+    source = write_form(str(tmp_path / "form.csv"), rows=80, seed=5)
+    names = sorted(_names(source))
+    rejected = set(names[:3])
+    execute = local_client._execute
+
+    def reject_some(query):
+        # Like rows violating a constraint, until the data is fixed
+        if rejected and query._action == "upsert" and any(row["full_name"] in rejected for row in query._payload):
+            raise ValueError("new row violates check constraint")
+        return execute(query)
+
+    local_client._execute = reject_some
+
+    async def main():
+        await upload_jobs.start_workers(workers=1)
+        try:
+            shutil.copy(source, tmp_path / "first.csv")
+            first = await _run_upload("first", str(tmp_path / "first.csv"), "same-content")
+            assert first["status"] == "completed_with_errors"
+            status = UploadStatusResponse(**first)
+            assert status.progress.failed == len(rejected)
+            assert {row.fullName for row in status.failedRows} == rejected
+            assert all("check constraint" in row.error for row in status.failedRows)
+            assert set(local_client.tables["staging"]) == set(names) - rejected
+
+            rejected.clear()
+            shutil.copy(source, tmp_path / "second.csv")
+            second = await _run_upload("second", str(tmp_path / "second.csv"), "same-content")
+            assert second["uploadId"] == "second" and second["status"] == "completed"
+            assert set(local_client.tables["staging"]) == set(names)
+
+            shutil.copy(source, tmp_path / "third.csv")
+            assert upload_jobs.submit_upload("third", str(tmp_path / "third.csv"), "form.csv", datetime.utcnow(), "same-content") is second
+        finally:
+            await upload_jobs.stop_workers()
+
+    asyncio.run(main())